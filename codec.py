@@ -0,0 +1,154 @@
+"""Wire format for mesh messages between nodes.
+
+Known message types are sent as a fixed 4-byte header - opcode, sender's
+node ID and payload length - followed by the message data as compact JSON,
+or nothing when there is no data. Unknown types are sent as a whole JSON
+message. JSON always starts with '{' (0x7b), so a first byte below 16 marks
+a binary frame.
+
+JSON goes through msgspec or orjson when one is installed, else the stdlib
+json module. Their output is not byte-identical: msgspec and orjson write
+non-ASCII as raw UTF-8 where json escapes it, and every decoder reads both.
+Other differences do matter, so message data must be a dict with str keys
+holding finite values: orjson raises TypeError on int keys, and NaN or
+infinity goes out as null from msgspec and orjson but as a bare NaN token
+from json, which the other two reject.
+"""
+import functools
+import json
+import struct
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if msgspec:
+    _dumps = msgspec.json.Encoder().encode
+    _decode = msgspec.json.Decoder().decode
+
+    def _loads(data):
+        try:
+            return _decode(data)
+        except msgspec.DecodeError as e:
+            # Callers expect json's ValueError for malformed input
+            raise ValueError(str(e)) from None
+elif orjson:
+    _dumps = orjson.dumps
+    _loads = orjson.loads  # Reads bytes and memoryviews without a copy
+else:
+    def _dumps(obj):
+        return json.dumps(obj, separators=(',', ':')).encode()
+
+    def _loads(data):
+        return json.loads(bytes(data))
+
+HEARTBEAT = 1
+ELECTION = 2
+ELECTION_RESPONSE = 3
+NEW_MASTER = 4
+NODE_SHUTDOWN = 5
+
+_TYPES = {
+    HEARTBEAT: 'HEARTBEAT',
+    ELECTION: 'ELECTION',
+    ELECTION_RESPONSE: 'ELECTION_RESPONSE',
+    NEW_MASTER: 'NEW_MASTER',
+    NODE_SHUTDOWN: 'NODE_SHUTDOWN',
+}
+_OPCODES = {name: opcode for opcode, name in _TYPES.items()}
+
+_JSON_LEAD = ord('{')
+_JSON_KEYS = frozenset(('type', 'from', 'data'))
+
+_HEADER = struct.Struct('!BBH')  # opcode, from, payload length
+HEADER_SIZE = _HEADER.size
+
+
+def encode(message_type, from_id, data=None):
+    """Return the datagram for a message"""
+    if not data:
+        return _encode_bare(message_type, from_id)
+    opcode = _OPCODES.get(message_type)
+    if opcode is None:
+        return _encode_json(message_type, from_id, data)
+    payload = _dumps(data)
+    return _HEADER.pack(opcode, from_id, len(payload)) + payload
+
+
+@functools.lru_cache(maxsize=32)
+def _encode_bare(message_type, from_id):
+    # Messages without data depend only on (type, sender), so a node encodes
+    # each of them once rather than on every send
+    opcode = _OPCODES.get(message_type)
+    if opcode is not None:
+        return _HEADER.pack(opcode, from_id, 0)
+    return _encode_json(message_type, from_id, {})
+
+
+def _encode_json(message_type, from_id, data):
+    message = {
+        'type': message_type,
+        'from': from_id,
+        'data': data
+    }
+    return _dumps(message)
+
+
+@functools.lru_cache(maxsize=256)
+def heartbeat(from_id):
+    """Return the HEARTBEAT message dict for a sender.
+
+    The dict is shared between calls, so receivers must not modify it.
+    """
+    return {'type': 'HEARTBEAT', 'from': from_id, 'data': {}}
+
+
+def decode(data):
+    """Return the {'type', 'from', 'data'} message dict for a datagram.
+
+    data may be a memoryview into a receive buffer; only a JSON payload is
+    copied out of it. Raises ValueError (or struct.error for a short header)
+    for anything that is not a well-formed mesh message.
+    """
+    if not data:
+        raise ValueError("empty datagram")
+    opcode = data[0]
+    if opcode >= 16:
+        if opcode != _JSON_LEAD:
+            raise ValueError(f"not a mesh message (first byte {opcode:#04x})")
+        message = _loads(data)
+        if not isinstance(message, dict) or not _JSON_KEYS <= message.keys():
+            raise ValueError("JSON message without type/from/data")
+        if not isinstance(message['type'], str):
+            raise ValueError(f"message type is not a string: {message['type']!r}")
+        _check_from(message['from'])
+        _check_data(message['data'])
+        return message
+    opcode, from_id, length = _HEADER.unpack_from(data)
+    if opcode == HEARTBEAT:
+        return heartbeat(from_id)
+    message_type = _TYPES.get(opcode)
+    if message_type is None:
+        raise ValueError(f"unknown opcode {opcode}")
+    if len(data) < HEADER_SIZE + length:
+        raise ValueError(f"truncated frame: {len(data)} bytes, payload length {length}")
+    payload = _loads(data[HEADER_SIZE:HEADER_SIZE + length]) if length else {}
+    _check_data(payload)
+    return {'type': message_type, 'from': from_id, 'data': payload}
+
+
+def _check_from(from_id):
+    # Node IDs are the last address octet; bool is an int but not an ID
+    if type(from_id) is not int or not 0 <= from_id <= 255:
+        raise ValueError(f"sender is not a node ID: {from_id!r}")
+
+
+def _check_data(data):
+    if not isinstance(data, dict):
+        raise ValueError(f"message data is not an object: {type(data).__name__}")
@@ -6,10 +6,9 @@ from PyQt5.QtWidgets import (
     QHBoxLayout, 
     QLabel, 
     QTextEdit)
-from PyQt5.QtCore import pyqtSignal, QThread
+from PyQt5.QtCore import pyqtSignal, QThread, QTimer
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
-import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
 import socket
 import json
@@ -27,8 +26,11 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Position datagrams from the simulator: node_id, x, y, z as native floats
+_POSITION = struct.Struct("ffff")
+
 class NetworkVisualizerWidget(QWidget):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, refresh_hz=30):
         super().__init__(parent)
         self.setMinimumSize(600, 300)
         self.nodes = {}
@@ -36,6 +38,10 @@ class NetworkVisualizerWidget(QWidget):
         self.center_x = 2.5
         self.center_y = 2.5
         self.radius = 1.5
+        # Default layout slots on a circle, computed once
+        self._ring = [(self.center_x + self.radius * math.cos(k * math.tau / 3),
+                       self.center_y + self.radius * math.sin(k * math.tau / 3))
+                      for k in range(3)]
         self.last_positions = {}  # Store last known positions for each node
         
         # Create the figure and canvas
@@ -59,8 +65,24 @@ class NetworkVisualizerWidget(QWidget):
         self.ax.set_xticks([i/2 for i in range(13)])
         self.ax.set_yticks([i/2 for i in range(13)])
         self.ax.tick_params(axis='both', which='major', labelsize=8)
+        self.ax.set_xlabel('x-axis(meter)')
+        self.ax.set_ylabel('x-axis(meter)')
         
         self._create_legend()
+        self._edges = {}  # {(node_a, node_b): Line2D}, node_a < node_b
+
+        # Nodes and edges are animated artists blitted over a cached
+        # background holding the axes, grid and legend
+        self._bg = None
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+
+        # Updates only mark the view dirty; repaints happen at most refresh_hz
+        # times per second however fast signals arrive
+        self.refresh_hz = refresh_hz
+        self._dirty = False
+        self._redraw_timer = QTimer(self)
+        self._redraw_timer.setSingleShot(True)
+        self._redraw_timer.timeout.connect(self._flush_redraw)
 
     def _create_legend(self):
         master_patch = mpatches.Patch(color='r', label='Master Node')
@@ -83,12 +105,18 @@ class NetworkVisualizerWidget(QWidget):
             x, y = self.last_positions[node_id]
         else:
             # Calculate default position using circular layout
-            num_nodes = len([n for n in self.nodes.values() if n["type"] != "MONITOR"])
-            angle = (num_nodes * 2 * math.pi) / 3
-            x = self.center_x + self.radius * math.cos(angle)
-            y = self.center_y + self.radius * math.sin(angle)
+            # Monitors are never stored, so len(self.nodes) counts the other nodes
+            x, y = self._ring[len(self.nodes) % len(self._ring)]
 
         pos = (x, y)
+        # Each node owns its circle and label for its whole lifetime; the
+        # update methods mutate them rather than creating new artists
+        circle = mpatches.Circle(pos, 0.2, ec='black', zorder=2, animated=True)
+        self.ax.add_patch(circle)
+        label = self.ax.annotate('', xy=pos, xytext=(0, 0),
+                        textcoords='offset points',
+                        ha='center', va='center',
+                        color='black', zorder=3, animated=True)
         self.nodes[node_id] = {
             "pos": pos,
             "type": node_type,
@@ -96,18 +124,34 @@ class NetworkVisualizerWidget(QWidget):
             "color": 'g',
             "port": port,
             "is_master": False,
-            "last_seen": time.time()
+            "last_seen": time.time(),
+            "circle": circle,
+            "label": label
         }
+        self._refresh_node(node_id)
+
+        # Connect the new node to every existing node
+        for other_id, other in self.nodes.items():
+            if other_id == node_id:
+                continue
+            line, = self.ax.plot([x, other["pos"][0]], [y, other["pos"][1]],
+                                 color='lightgray', zorder=1, animated=True)
+            line.set_visible(other["status"] == "Active")
+            self._edges[(min(node_id, other_id), max(node_id, other_id))] = line
 
         logger.info(f"Added new node: ID={node_id}, Type={node_type}, Port={port}, Position=({x:.3f}, {y:.3f})")
-        self._redraw()
+        self._schedule_redraw()
 
     def removeNode(self, node_id):
         if node_id in self.nodes:
             # Store the position before removing
-            self.last_positions[node_id] = self.nodes[node_id]["pos"]
-            del self.nodes[node_id]
-            self._redraw()
+            node = self.nodes.pop(node_id)
+            self.last_positions[node_id] = node["pos"]
+            node["circle"].remove()
+            node["label"].remove()
+            for key in [key for key in self._edges if node_id in key]:
+                self._edges.pop(key).remove()
+            self._schedule_redraw()
 
     def updateNodePosition(self, node_id, x, y):
         """Update node position based on received coordinates"""
@@ -116,86 +160,98 @@ class NetworkVisualizerWidget(QWidget):
         
         if node_id in self.nodes:
             old_pos = self.nodes[node_id]["pos"]
-            self.nodes[node_id]["pos"] = (x, y)
+            if abs(x - old_pos[0]) + abs(y - old_pos[1]) < 1e-3:
+                return
+            node = self.nodes[node_id]
+            node["pos"] = (x, y)
+            node["circle"].center = (x, y)
+            node["label"].xy = (x, y)
+            for (node_a, node_b), line in self._edges.items():
+                if node_id == node_a or node_id == node_b:
+                    pos_a = self.nodes[node_a]["pos"]
+                    pos_b = self.nodes[node_b]["pos"]
+                    line.set_data([pos_a[0], pos_b[0]], [pos_a[1], pos_b[1]])
             
-            logger.debug(f"Node {node_id} visualization position updated:")
-            logger.debug(f"  Old position: ({old_pos[0]:.3f}, {old_pos[1]:.3f})")
-            logger.debug(f"  New position: ({x:.3f}, {y:.3f})")
+            logger.debug("Node %d visualization position updated: (%.3f, %.3f) -> (%.3f, %.3f)",
+                         node_id, old_pos[0], old_pos[1], x, y)
             
-            self._redraw()
+            self._schedule_redraw()
         else:
-            logger.info(f"Storing position for future node: {node_id} at ({x:.3f}, {y:.3f})")
+            logger.info("Storing position for future node: %d at (%.3f, %.3f)", node_id, x, y)
 
     def updateMasterStatus(self, master_id):
-        for node in self.nodes.values():
-            if node["status"] == "Active":
+        for node_id, node in self.nodes.items():
+            if node["status"] == "Active" and node["is_master"]:
                 node["is_master"] = False
                 node["color"] = 'g'
+                self._refresh_node(node_id)
 
         if master_id in self.nodes and self.nodes[master_id]["status"] == "Active":
             self.nodes[master_id]["is_master"] = True
             self.nodes[master_id]["color"] = 'r'
-        self._redraw()
+            self._refresh_node(master_id)
+        self._schedule_redraw()
 
     def updateNodeStatus(self, node_id, status):
-        if node_id in self.nodes:
-            if self.nodes[node_id]["is_master"]:
-                self.nodes[node_id]["color"] = 'r'
-            else:
-                self.nodes[node_id]["color"] = 'g'
-            self.nodes[node_id]["last_seen"] = time.time()
-            
-            if self.nodes[node_id]["is_master"]:
-                self.updateMasterStatus(None)
-            
-            self._redraw()
-
-    def _redraw(self):
-        self.ax.clear()
-        # Configure plot
-        self.ax.set_xlim(0, 6)
-        self.ax.set_ylim(0, 6)
-        self.ax.set_aspect('equal')
-        self.ax.axis('on')
-        self.ax.grid(True)
+        node = self.nodes.get(node_id)
+        if node is None or node["status"] == status:
+            return
+        node["status"] = status
+        # Only connections between two active nodes are shown
+        for (node_a, node_b), line in self._edges.items():
+            if node_id == node_a or node_id == node_b:
+                line.set_visible(self.nodes[node_a]["status"] == "Active" and
+                                 self.nodes[node_b]["status"] == "Active")
+        if node["is_master"]:
+            node["color"] = 'r'
+        else:
+            node["color"] = 'g'
+        node["last_seen"] = time.time()
+        self._refresh_node(node_id)
         
-        # Set ticks every 0.5m
-        self.ax.set_xticks([i/2 for i in range(13)])
-        self.ax.set_yticks([i/2 for i in range(13)])
-        self.ax.tick_params(axis='both', which='major', labelsize=8)
+        if node["is_master"]:
+            self.updateMasterStatus(None)
+        
+        self._schedule_redraw()
+
+    def _refresh_node(self, node_id):
+        """Sync a node's circle color and label text with its master state"""
+        node = self.nodes[node_id]
+        node["circle"].set_facecolor(node["color"])
+        status_text = "Master" if node["is_master"] else "Node"
+        node["label"].set_text(f'Node {node_id}\n({status_text})')
+
+    def _schedule_redraw(self):
+        self._dirty = True
+        if not self._redraw_timer.isActive():
+            self._redraw_timer.start(int(1000 / self.refresh_hz))
+
+    def _flush_redraw(self):
+        if self._dirty:
+            self._dirty = False
+            self._redraw()
 
+    def _on_draw(self, event):
+        # A full draw (first show, resize) invalidates the cached background
+        self._bg = self.canvas.copy_from_bbox(self.ax.bbox)
+        self._draw_animated()
 
-        # Draw connections between nodes
-        nodes = list(self.nodes.items())
-        
-        for i in range(len(nodes)):
-            for j in range(i + 1, len(nodes)):
-                node1 = nodes[i][1]
-                node2 = nodes[j][1]
-                self.ax.plot([node1["pos"][0], node2["pos"][0]], 
-                        [node1["pos"][1], node2["pos"][1]], 
-                        color='lightgray', zorder=1)
-
-        # Draw nodes
-        for node_id, node in self.nodes.items():
-            node_color = 'r' if node["is_master"] else 'g'
-            
-            circle = plt.Circle(node["pos"], 0.2, color=node_color, 
-                            ec='black', zorder=2)
-            self.ax.add_artist(circle)
-            
-            status_text = "Master" if node["is_master"] else "Node"
-                
-            self.ax.annotate(f'Node {node_id}\n({status_text})',
-                        xy=node["pos"], xytext=(0, 0),
-                        textcoords='offset points',
-                        ha='center', va='center',
-                        color='black', zorder=3)
+    def _draw_animated(self):
+        # Artists are kept up to date by the update methods; just draw them
+        for line in self._edges.values():
+            self.ax.draw_artist(line)
+        for node in self.nodes.values():
+            self.ax.draw_artist(node["circle"])
+            self.ax.draw_artist(node["label"])
 
-        self.ax.set_xlabel('x-axis(meter)')
-        self.ax.set_ylabel('x-axis(meter)')
-        self._create_legend()
-        self.figure.canvas.draw()
+    def _redraw(self):
+        if self._bg is None:
+            # No background cached yet; a full draw caches it via _on_draw
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self._bg)
+        self._draw_animated()
+        self.canvas.blit(self.ax.bbox)
 
 class NetworkMonitorThread(QThread):
     message_received = pyqtSignal(str)
@@ -213,6 +269,14 @@ class NetworkMonitorThread(QThread):
         self.is_running = False
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.socket.bind((host, port))
+        # Message type -> handler(data), looked up once per message
+        self._handlers = {
+            'LOG': self._on_log,
+            'NODE_ADDED': self._on_node_added,
+            'NODE_STATUS': self._on_node_status,
+            'MASTER_CHANGED': self._on_master_changed,
+            'NODE_REMOVED': self._on_node_removed,
+        }
         
         # Send initial connection message in a retry loop
         self.send_connection_message()
@@ -251,22 +315,30 @@ class NetworkMonitorThread(QThread):
     
     def process_message(self, message):
         msg_type = message['type']
-        data = message.get('data', {})
+        data = message['data']
 
         # Log received message for debugging
-        logger.debug(f"Received message: type={msg_type}, data={data}")
-
-        if msg_type == 'LOG':
-            self.message_received.emit(data['message'])
-        elif msg_type == 'NODE_ADDED':
-            logger.info(f"Adding node: port={data['port']}, type={data['node_type']}")
-            self.node_added.emit(data['port'], data['node_type'])
-        elif msg_type == 'NODE_STATUS':
-            self.node_status_changed.emit(data['node_id'], data['status'])
-        elif msg_type == 'MASTER_CHANGED':
-            self.master_changed.emit(data['master_id'])
-        elif msg_type == "NODE_REMOVED":
-            self.node_removed.emit(data['node_id'])
+        logger.debug("Received message: type=%s, data=%s", msg_type, data)
+
+        handler = self._handlers.get(msg_type)
+        if handler:
+            handler(data)
+
+    def _on_log(self, data):
+        self.message_received.emit(data['message'])
+
+    def _on_node_added(self, data):
+        logger.info(f"Adding node: port={data['port']}, type={data['node_type']}")
+        self.node_added.emit(data['port'], data['node_type'])
+
+    def _on_node_status(self, data):
+        self.node_status_changed.emit(data['node_id'], data['status'])
+
+    def _on_master_changed(self, data):
+        self.master_changed.emit(data['master_id'])
+
+    def _on_node_removed(self, data):
+        self.node_removed.emit(data['node_id'])
 
     def stop(self):
         self.is_running = False
@@ -302,11 +374,14 @@ class PositionReceiverThread(QThread):
         sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
         sock.bind(("", 17500))
+        buf = bytearray(1024)
         
         while self.is_running:
             try:
-                data, addr = sock.recvfrom(1024)
-                position_data = struct.unpack("ffff", data)
+                nbytes, addr = sock.recvfrom_into(buf)
+                if nbytes != _POSITION.size:
+                    raise ValueError(f"expected {_POSITION.size} bytes, got {nbytes}")
+                position_data = _POSITION.unpack_from(buf)
 
                 # Extract position data
                 node_id = int(position_data[0])
@@ -314,11 +389,11 @@ class PositionReceiverThread(QThread):
                 
                 # Check if position has changed
                 if self.positions_different(node_id, x, y, z):
-                    logger.info(f"Position changed - Node {node_id}: X={x:.3f}, Y={y:.3f}, Z={z:.3f}")
+                    logger.info("Position changed - Node %d: X=%.3f, Y=%.3f, Z=%.3f", node_id, x, y, z)
                     self.update_last_position(node_id, x, y, z)
                     self.position_updated.emit(node_id, x, y)
                 else:
-                    logger.debug(f"Skipping update - No position change for Node {node_id}")
+                    logger.debug("Skipping update - No position change for Node %d", node_id)
                     
             except Exception as e:
                 logger.error(f"Error receiving position data: {e}")
@@ -362,6 +437,8 @@ class MonitorGUI(QMainWindow):
         """)
         self.log_text.setReadOnly(True)
         self.log_text.setMinimumWidth(150)
+        # Let Qt drop the oldest lines so appends stay cheap on long runs
+        self.log_text.document().setMaximumBlockCount(1000)
         left_layout.addWidget(log_label)
         left_layout.addWidget(self.log_text)
 
@@ -1,10 +1,19 @@
 from node_base import Node, NodeType
+import asyncio
 import socket
 import json
 import time
 import threading
 import logging
 
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+# Never block the caller on a full send buffer when the GUI is unreachable
+_SEND_FLAGS = getattr(socket, 'MSG_DONTWAIT', 0)
+
 # Configure logging with more detailed format
 logging.basicConfig(
     level=logging.INFO,
@@ -12,45 +21,110 @@ logging.basicConfig(
     datefmt='%Y-%m-%d %H:%M:%S'
 )
 
+class GuiProtocol(asyncio.DatagramProtocol):
+    """Receives GUI datagrams on the handler's event loop"""
+
+    def __init__(self, handler):
+        self.handler = handler
+
+    def datagram_received(self, data, addr):
+        try:
+            message = json.loads(data)
+        except ValueError as e:
+            logging.error(f"Error receiving GUI message: {e}")
+            return
+        if not isinstance(message, dict):
+            logging.error(f"Ignoring GUI message that is not an object: {message!r}")
+            return
+        if message.get('type') == 'GUI_CONNECTED':
+            logging.info("GUI connected - sending network state")
+            self.handler.schedule_network_state()
+
+    def error_received(self, exc):
+        logging.error(f"Error receiving GUI message: {exc}")
+
+
 class NetworkHandler:
     def __init__(self, handler_host='0.0.0.0', handler_port=5566, gui_host='192.168.1.2', gui_port=5567):
         self.handler_host = handler_host
         self.handler_port = handler_port
         self.gui_host = gui_host
         self.gui_port = gui_port
+        self.gui_addr = (gui_host, gui_port)
+        self._gui_drops = 0
+        self._drop_report_pending = False
+        self._gui_prefixes = {}  # {message_type: encoded message prefix}
         self.monitor_node = None
         self.is_running = False
-        self.known_nodes = set()
+        self._loop = None
+        self._loop_thread = None
+        self._gui_transport = None
         self.master_id = None
+        self.known_nodes = set()
+        # Message type -> handler(from_node, data) for the monitor node's messages
+        self._handlers = {
+            'NODE_SHUTDOWN': self._on_node_shutdown,
+            'HEARTBEAT': self._on_heartbeat,
+            'ELECTION': self._on_election,
+            'NEW_MASTER': self._on_new_master,
+            'ELECTION_RESPONSE': self._on_election_response,
+            'GUI_CONNECTED': self._on_gui_connected,
+        }
         
         # Setup UDP socket for GUI communication
         self.gui_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.gui_socket.bind((handler_host, handler_port))
-        self.gui_socket.settimeout(0.1)  # Add timeout for non-blocking
         
         logging.info(f"Network handler initialized on {handler_host}:{handler_port}")
         logging.info(f"Connected to GUI at {gui_host}:{gui_port}")
 
     def send_to_gui(self, message_type, data):
-        message = {
-            'type': message_type,
-            'data': data
-        }
+        # Splice the encoded data into a cached '{"type": ..., "data": ' prefix
+        # rather than building and encoding a wrapper dict per message
+        prefix = self._gui_prefixes.get(message_type)
+        if prefix is None:
+            prefix = f'{{"type": {json.dumps(message_type)}, "data": '.encode()
+            self._gui_prefixes[message_type] = prefix
+        data_json = json.dumps(data)
         try:
-            msg_json = json.dumps(message)
-            self.gui_socket.sendto(
-                msg_json.encode(),
-                (self.gui_host, self.gui_port)
-            )
-            logging.info(f"OUT -> GUI [{message_type}]: {json.dumps(data, indent=2)}")
-        except Exception as e:
+            self.gui_socket.sendto(prefix + data_json.encode() + b'}', _SEND_FLAGS, self.gui_addr)
+        except BlockingIOError:
+            # Send buffer full (GUI not draining) - drop rather than block
+            self._count_gui_drop()
+            return
+        except OSError as e:
             logging.error(f"Error sending to GUI: {e}")
+            return
+        logging.info(f"OUT -> GUI [{message_type}]: {data_json}")
+
+    def _count_gui_drop(self):
+        """Count a dropped GUI message, reported in bulk a second later"""
+        self._gui_drops += 1
+        if self._drop_report_pending:
+            return
+        self._drop_report_pending = True
+        if self._loop is None or self._loop.is_closed():
+            self._report_gui_drops()
+            return
+        # May be called from the monitor node's thread, hence threadsafe
+        self._loop.call_soon_threadsafe(self._loop.call_later, 1.0, self._report_gui_drops)
+
+    def _report_gui_drops(self):
+        """Log the GUI messages dropped since the last report"""
+        # Clear the flag first so a drop counted meanwhile schedules a report
+        self._drop_report_pending = False
+        drops, self._gui_drops = self._gui_drops, 0
+        if drops:
+            logging.warning(f"Dropped {drops} GUI message(s): send buffer full")
+
+    def schedule_network_state(self, delay=0.5):
+        """Send network state after a short delay without blocking the caller"""
+        # Give the GUI time to get ready while we keep draining sockets.
+        # May be called from the monitor node's thread, hence threadsafe.
+        self._loop.call_soon_threadsafe(self._loop.call_later, delay, self.send_network_state)
 
     def send_network_state(self):
         """Send current network state to GUI"""
-        # Add short delay to ensure GUI is ready
-        time.sleep(0.5)
-        
         # Send monitor node
         self.send_to_gui('NODE_ADDED', {
             'port': 5000,
@@ -58,7 +132,8 @@ class NetworkHandler:
         })
         
         # Send all known nodes
-        for node_id in self.known_nodes:
+        known_nodes = sorted(self.known_nodes)
+        for node_id in known_nodes:
             if node_id != 0:  # Skip monitor node
                 self.send_to_gui('NODE_ADDED', {
                     'port': 5000 + node_id,
@@ -71,12 +146,12 @@ class NetworkHandler:
                 'master_id': self.master_id
             })
             
-        logging.info(f"Sent network state: nodes={self.known_nodes}, master={self.master_id}")
+        logging.info(f"Sent network state: nodes={known_nodes}, master={self.master_id}")
 
     def process_node_message(self, message):
         msg_type = message['type']
         from_node = message['from']
-        data = message.get('data', {})
+        data = message['data']
         
         logging.info(f"IN  <- Node {from_node} [{msg_type}]: {json.dumps(data, indent=2)}")
         
@@ -91,72 +166,64 @@ class NetworkHandler:
                 'message': f"Node {from_node} (Port {5000 + from_node}) joined network"
             })
         
-        if msg_type == 'NODE_SHUTDOWN':
-            logging.info(f"Node {from_node} is shutting down")
-            if from_node in self.known_nodes:
-                self.known_nodes.remove(from_node)
-                self.send_to_gui('NODE_REMOVED', {
-                    'node_id': from_node
-                })
-                self.send_to_gui('LOG', {
-                    'message': f"Node {from_node} has left the network"
-                })
-        
-        elif msg_type == 'HEARTBEAT':
-            self.master_id = from_node
-            self.send_to_gui('MASTER_CHANGED', {
-                'master_id': from_node
-            })
-            
-        elif msg_type == 'ELECTION':
-            logging.info(f"Election process started by Node {from_node}")
-            self.send_to_gui('LOG', {
-                'message': "Election process started"
+        handler = self._handlers.get(msg_type)
+        if handler:
+            handler(from_node, data)
+
+    def _on_node_shutdown(self, from_node, data):
+        logging.info(f"Node {from_node} is shutting down")
+        if from_node in self.known_nodes:
+            self.known_nodes.remove(from_node)
+            self.send_to_gui('NODE_REMOVED', {
+                'node_id': from_node
             })
-            
-        elif msg_type == 'NEW_MASTER':
-            self.master_id = data['master_id']
-            logging.info(f"Node {self.master_id} elected as new master")
             self.send_to_gui('LOG', {
-                'message': f"Node {self.master_id} became master"
-            })
-            self.send_to_gui('MASTER_CHANGED', {
-                'master_id': self.master_id
+                'message': f"Node {from_node} has left the network"
             })
-            
-        elif msg_type == 'ELECTION_RESPONSE':
-            logging.info(f"Election response received from Node {from_node}")
-            
-        elif msg_type == 'GUI_CONNECTED':
-            logging.info("New GUI connected - sending current network state")
-            self.send_network_state()
-
-    def monitor_nodes(self):
-        while self.is_running:
-            # Check for GUI messages
-            try:
-                data, addr = self.gui_socket.recvfrom(1024)
-                message = json.loads(data.decode())
-                if message['type'] == 'GUI_CONNECTED':
-                    logging.info("GUI connected - sending network state")
-                    self.send_network_state()
-            except socket.timeout:
-                pass
-            except Exception as e:
-                logging.error(f"Error receiving GUI message: {e}")
-            
-            time.sleep(0.1)  # Short sleep to prevent CPU overuse
-            
+
+    def _on_heartbeat(self, from_node, data):
+        self.master_id = from_node
+        self.send_to_gui('MASTER_CHANGED', {
+            'master_id': from_node
+        })
+
+    def _on_election(self, from_node, data):
+        logging.info(f"Election process started by Node {from_node}")
+        self.send_to_gui('LOG', {
+            'message': "Election process started"
+        })
+
+    def _on_new_master(self, from_node, data):
+        self.master_id = data['master_id']
+        logging.info(f"Node {self.master_id} elected as new master")
+        self.send_to_gui('LOG', {
+            'message': f"Node {self.master_id} became master"
+        })
+        self.send_to_gui('MASTER_CHANGED', {
+            'master_id': self.master_id
+        })
+
+    def _on_election_response(self, from_node, data):
+        logging.info(f"Election response received from Node {from_node}")
+
+    def _on_gui_connected(self, from_node, data):
+        logging.info("New GUI connected - sending current network state")
+        self.schedule_network_state()
+
     def start(self):
+        # Serve the GUI socket from an event loop instead of a polling thread
+        self._loop = uvloop.new_event_loop() if uvloop else asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._loop_thread.start()
+        self._gui_transport, _ = asyncio.run_coroutine_threadsafe(
+            self._loop.create_datagram_endpoint(lambda: GuiProtocol(self), sock=self.gui_socket),
+            self._loop
+        ).result()
+        logging.info("GUI event loop started")
+
         # Initialize and start monitor node
         self.monitor_node = Node('192.168.0.0', 5000, NodeType.MONITOR)
-        # Override the process_message method to add logging
-        original_process = self.monitor_node._process_message
-        def logged_process(message):
-            # Log the raw message received by the monitor node
-            logging.info(f"RAW <- Port {message.get('from', 'unknown')}: {json.dumps(message, indent=2)}")
-            return original_process(message)
-        self.monitor_node._process_message = self.process_node_message
+        self.monitor_node.message_handler = self.process_node_message
         self.monitor_node.start()
         logging.info("Monitor node started on port 5000")
         
@@ -166,16 +233,21 @@ class NetworkHandler:
             'port': 5000,
             'node_type': "MONITOR"
         })
-        
-        # Start monitoring thread
         self.is_running = True
-        threading.Thread(target=self.monitor_nodes, daemon=True).start()
-        logging.info("Node monitoring thread started")
 
     def stop(self):
         self.is_running = False
         if self.monitor_node:
             self.monitor_node.stop()
+        if self._loop:
+            if self._gui_transport:
+                self._loop.call_soon_threadsafe(self._gui_transport.close)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            # The loop can only be closed once run_forever has returned
+            self._loop_thread.join()
+            self._loop.close()
+        # The transport's own close is deferred to a loop iteration that the
+        # stop above may never run, so close the socket here either way
         self.gui_socket.close()
         logging.info("Network handler stopped")
 
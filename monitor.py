@@ -2,27 +2,52 @@ import json
 import socket
 import struct
 import threading
+import heapq
+import queue
 from node_base import Node, NodeType
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                            QHBoxLayout, QLabel, QTextEdit)
-from PyQt5.QtCore import pyqtSignal, QThread
+from PyQt5.QtCore import Qt, pyqtSignal, QThread, QTimer
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
-import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
+from matplotlib.collections import LineCollection
+from matplotlib.colors import to_rgba
+import numpy as np
 import sys
 import time
 import math
 
+_RGBA = {color: to_rgba(color) for color in ('r', 'g', 'gray')}
+
 class NetworkVisualizerWidget(QWidget):
-    def __init__(self, parent=None):
+    NODE_RADIUS = 0.2
+    MAX_NODES = 256  # Node IDs are the last IP octet
+
+    def __init__(self, parent=None, refresh_hz=20):
         super().__init__(parent)
         self.setMinimumSize(400, 300)
         self.nodes = {}
         self.last_heartbeat = {}
+        self._current_master = None
         self.center_x = 2.5
         self.center_y = 2.5
         self.radius = 1.5
+        # Default layout slots on a circle, computed once
+        self._ring = [(self.center_x + self.radius * math.cos(k * math.tau / 3),
+                       self.center_y + self.radius * math.sin(k * math.tau / 3))
+                      for k in range(3)]
+
+        # Positions and colors live in preallocated parallel arrays (one row
+        # per node) so a redraw hands them to a single scatter collection and
+        # builds every edge with one gather; only the first _n_rows are in use
+        self._row_of = {}  # {node_id: row}
+        self._n_rows = 0
+        self._pos = np.zeros((self.MAX_NODES, 2), dtype=np.float32)
+        self._rgba = np.zeros((self.MAX_NODES, 4), dtype=np.float32)
+        self._active_mask = np.zeros(self.MAX_NODES, dtype=bool)
+        self._labels = []  # Text artist per row
+        self._active_pairs = None  # (rows_a, rows_b) of edges; None when stale
         
         # Create the figure and canvas
         self.figure = Figure(figsize=(6, 4))
@@ -40,9 +65,28 @@ class NetworkVisualizerWidget(QWidget):
         self.ax.set_aspect('equal')
         self.ax.axis('on')
         self.ax.grid(True)
+        self.ax.set_xlabel('X-axis')
+        self.ax.set_ylabel('Y-axis')
         
         self._create_legend()
 
+        # Persistent artists; only their data changes between frames.
+        # Axes, grid and legend form a cached background that is blitted under them.
+        self._scatter = self.ax.scatter([], [],
+                                        edgecolors='black', zorder=2, animated=True)
+        self._edges = LineCollection([], colors='lightgray', zorder=1, animated=True)
+        self.ax.add_collection(self._edges)
+        self._bg = None
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+
+        # Updates only mark the view dirty; repaints happen at most refresh_hz
+        # times per second however fast signals arrive
+        self.refresh_hz = refresh_hz
+        self._dirty = False
+        self._redraw_timer = QTimer(self)
+        self._redraw_timer.setSingleShot(True)
+        self._redraw_timer.timeout.connect(self._flush_redraw)
+
     def _create_legend(self):
         master_patch = mpatches.Patch(color='r', label='Master Node')
         active_patch = mpatches.Patch(color='g', label='Active Node')
@@ -57,14 +101,10 @@ class NetworkVisualizerWidget(QWidget):
             return
             
         # Default initial position using circle layout
-        num_nodes = len([n for n in self.nodes.values() if n["type"] != "MONITOR"])
-        angle = (num_nodes * 2 * math.pi) / 3
-        x = self.center_x + self.radius * math.cos(angle)
-        y = self.center_y + self.radius * math.sin(angle)
-        pos = (x, y)
+        # Monitors are never stored, so len(self.nodes) counts the other nodes
+        x, y = self._ring[len(self.nodes) % len(self._ring)]
 
         self.nodes[node_id] = {
-            "pos": pos,
             "type": node_type,
             "status": "Active",
             "color": 'g',
@@ -72,7 +112,19 @@ class NetworkVisualizerWidget(QWidget):
             "is_master": False,
             "last_seen": time.time()
         }
-        self._redraw()
+        row = self._row_of.get(node_id)
+        if row is None:
+            row = self._n_rows
+            self._n_rows += 1
+            self._row_of[node_id] = row
+            self._labels.append(self.ax.text(x, y, '', ha='center', va='center',
+                                             color='black', zorder=3, animated=True))
+        self._pos[row] = (x, y)
+        self._labels[row].set_position((x, y))
+        self._active_mask[row] = True
+        self._active_pairs = None
+        self._refresh_node(node_id)
+        self._schedule_redraw()
 
     def updateNodePosition(self, node_id, x, y):
         """Update node position based on received coordinates"""
@@ -85,89 +137,126 @@ class NetworkVisualizerWidget(QWidget):
             scaled_x = max(0.2, min(4.8, scaled_x))
             scaled_y = max(0.2, min(4.8, scaled_y))
             
-            self.nodes[node_id]["pos"] = (scaled_x, scaled_y)
-            self._redraw()
+            row = self._row_of[node_id]
+            old_x, old_y = self._pos[row]
+            if abs(scaled_x - old_x) + abs(scaled_y - old_y) < 1e-3:
+                return
+            self._pos[row] = (scaled_x, scaled_y)
+            self._labels[row].set_position((scaled_x, scaled_y))
+            self._schedule_redraw()
 
     def updateMasterStatus(self, master_id):
-        for node in self.nodes.values():
+        # Every heartbeat re-announces the master; skip the walk and redraw
+        # when nothing would change
+        if master_id == self._current_master:
+            if master_id is None:
+                return
+            node = self.nodes.get(master_id)
+            if node is not None and node["is_master"]:
+                return
+        self._current_master = master_id
+
+        for node_id, node in self.nodes.items():
             if node["status"] == "Active":
                 node["is_master"] = False
                 node["color"] = 'g'
+                self._refresh_node(node_id)
 
         if master_id in self.nodes and self.nodes[master_id]["status"] == "Active":
             self.nodes[master_id]["is_master"] = True
             self.nodes[master_id]["color"] = 'r'
-        self._redraw()
+            self._refresh_node(master_id)
+        self._schedule_redraw()
 
     def updateNodeStatus(self, node_id, status):
-        if node_id in self.nodes:
-            old_status = self.nodes[node_id]["status"]
-            self.nodes[node_id]["status"] = status
-            
-            if status == "Active":
-                if self.nodes[node_id]["is_master"]:
-                    self.nodes[node_id]["color"] = 'r'
-                else:
-                    self.nodes[node_id]["color"] = 'g'
-                self.nodes[node_id]["last_seen"] = time.time()
+        node = self.nodes.get(node_id)
+        if node is None or node["status"] == status:
+            return
+        old_status = node["status"]
+        node["status"] = status
+        if (old_status == "Active") != (status == "Active"):
+            self._active_mask[self._row_of[node_id]] = status == "Active"
+            self._active_pairs = None
+        
+        if status == "Active":
+            if node["is_master"]:
+                node["color"] = 'r'
             else:
-                self.nodes[node_id]["color"] = 'gray'
-                self.nodes[node_id]["is_master"] = False
-            
-            if old_status == "Active" and status != "Active" and self.nodes[node_id]["is_master"]:
-                self.updateMasterStatus(None)
-            
-            self._redraw()
+                node["color"] = 'g'
+            node["last_seen"] = time.time()
+        else:
+            node["color"] = 'gray'
+            node["is_master"] = False
+        self._refresh_node(node_id)
+        
+        if old_status == "Active" and status != "Active" and node["is_master"]:
+            self.updateMasterStatus(None)
+        
+        self._schedule_redraw()
 
-    def _redraw(self):
-        self.ax.clear()
-        self.ax.set_xlim(0, 5)
-        self.ax.set_ylim(0, 5)
-        self.ax.set_aspect('equal')
-        self.ax.axis('on')
-        self.ax.grid(True)
+    def _refresh_node(self, node_id):
+        """Copy a node's color and label into its row"""
+        node = self.nodes[node_id]
+        row = self._row_of[node_id]
+        self._rgba[row] = _RGBA[node["color"]]
 
-        # Draw connections between active nodes
-        active_nodes = [(nid, node) for nid, node in self.nodes.items() 
-                       if node["status"] == "Active"]
-        
-        for i in range(len(active_nodes)):
-            for j in range(i + 1, len(active_nodes)):
-                node1 = active_nodes[i][1]
-                node2 = active_nodes[j][1]
-                self.ax.plot([node1["pos"][0], node2["pos"][0]], 
-                           [node1["pos"][1], node2["pos"][1]], 
-                           color='lightgray', zorder=1)
-
-        # Draw nodes
-        for node_id, node in self.nodes.items():
-            if node["status"] != "Active":
-                node_color = 'gray'
-            else:
-                node_color = 'r' if node["is_master"] else 'g'
-            
-            circle = plt.Circle(node["pos"], 0.2, color=node_color, 
-                              ec='black', zorder=2)
-            self.ax.add_artist(circle)
-            
-            status_text = "Master" if node["is_master"] else "Node"
-            if node["status"] != "Active":
-                status_text = "Inactive"
-                
-            self.ax.annotate(f'Port {node["port"]}\n({status_text})',
-                           xy=node["pos"], xytext=(0, 0),
-                           textcoords='offset points',
-                           ha='center', va='center',
-                           color='black', zorder=3)
+        status_text = "Master" if node["is_master"] else "Node"
+        if node["status"] != "Active":
+            status_text = "Inactive"
+        self._labels[row].set_text(f'Port {node["port"]}\n({status_text})')
 
-        self.ax.set_xlabel('X-axis')
-        self.ax.set_ylabel('Y-axis')
-        self._create_legend()
-        self.figure.canvas.draw()
+    def _on_draw(self, event):
+        # A full draw (first show, resize) invalidates the cached background.
+        # Scatter sizes are in points, so rescale them to NODE_RADIUS data units.
+        radius_px = (self.ax.transData.transform((self.NODE_RADIUS, 0)) -
+                     self.ax.transData.transform((0, 0)))[0]
+        self._scatter.set_sizes([(2 * radius_px * 72 / self.figure.dpi) ** 2])
+        self._bg = self.canvas.copy_from_bbox(self.ax.bbox)
+        self._draw_animated()
+
+    def _update_artists(self):
+        # Connections between active nodes; the pair list only changes with
+        # membership, so it is rebuilt then rather than every frame
+        if self._active_pairs is None:
+            active = np.flatnonzero(self._active_mask)
+            i, j = np.triu_indices(len(active), k=1)
+            self._active_pairs = (active[i], active[j])
+        rows_a, rows_b = self._active_pairs
+        self._edges.set_segments(np.stack([self._pos[rows_a], self._pos[rows_b]], axis=1))
+
+        # Nodes
+        n = self._n_rows
+        self._scatter.set_offsets(self._pos[:n])
+        self._scatter.set_facecolor(self._rgba[:n])
+
+    def _draw_animated(self):
+        self._update_artists()
+        self.ax.draw_artist(self._edges)
+        self.ax.draw_artist(self._scatter)
+        for text in self._labels:
+            self.ax.draw_artist(text)
+
+    def _schedule_redraw(self):
+        self._dirty = True
+        if not self._redraw_timer.isActive():
+            self._redraw_timer.start(int(1000 / self.refresh_hz))
+
+    def _flush_redraw(self):
+        if self._dirty:
+            self._dirty = False
+            self._redraw()
+
+    def _redraw(self):
+        if self._bg is None:
+            # No background cached yet; a full draw caches it via _on_draw
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self._bg)
+        self._draw_animated()
+        self.canvas.blit(self.ax.bbox)
 
 
 class MonitorThread(QThread):
-    message_received = pyqtSignal(str)
     node_status_changed = pyqtSignal(int, str)
     node_added = pyqtSignal(int, str)
     master_changed = pyqtSignal(int)
@@ -175,51 +264,147 @@ class MonitorThread(QThread):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.monitor_node = None
-        self.is_running = False
         self.known_nodes = set()
+        self.heartbeat_timeout = 3.0  # seconds
+        self._version = {}    # {node_id: count of heartbeats seen}
+        self._deadlines = []  # min-heap of (deadline, node_id, version)
+        self._inactive = set()
+        self._last_master = None   # last master_changed emitted
+        self._lock = threading.Lock()
+        self._timer = None
+        # Log lines are queued here and drained in batches by the GUI
+        self.log_queue = queue.SimpleQueue()
+        # Signals are buffered and emitted by _flush, keeping only the
+        # latest status per node and the latest master
+        self._new_nodes = set()
+        self._pending_status = {}  # {node_id: status}
+        self._pending_master = None
+        self._flush_timer = None
+        # Message type -> handler(from_node, data) for the monitor node's messages
+        self._handlers = {
+            'HEARTBEAT': self._on_heartbeat,
+            'ELECTION': self._on_election,
+            'NEW_MASTER': self._on_new_master,
+        }
 
     def run(self):
-        self.monitor_node = Node(5000, NodeType.MONITOR)
+        self.monitor_node = Node('192.168.0.0', 5000, NodeType.MONITOR)
         self.node_added.emit(5000, "MONITOR")
         self.known_nodes.add(0)
 
         def new_process_message(message):
-            msg_type = message['type']
             from_node = message['from']
             
             if from_node not in self.known_nodes:
-                self.node_added.emit(5000 + from_node, "NODE")
-                self.known_nodes.add(from_node)
-                self.message_received.emit(f"Node {from_node} (Port {5000 + from_node}) joined network")
+                with self._lock:
+                    self.known_nodes.add(from_node)
+                    self._new_nodes.add(from_node)
+                self.log_queue.put(f"Node {from_node} (Port {5000 + from_node}) joined network")
             
-            if msg_type == 'HEARTBEAT':
-                self.master_changed.emit(from_node)
-            elif msg_type == 'ELECTION':
-                self.message_received.emit("Election process started")
-            elif msg_type == 'NEW_MASTER':
-                new_master = message['data']['master_id']
-                self.message_received.emit(f"Node {new_master} became master")
-                self.master_changed.emit(new_master)
-
-        self.monitor_node._process_message = new_process_message
+            handler = self._handlers.get(message['type'])
+            if handler:
+                handler(from_node, message['data'])
+
+        self.monitor_node.message_handler = new_process_message
+
+        # Stale heartbeats are found by one single-shot timer aimed at the
+        # earliest deadline, running on this thread's Qt event loop
+        self._timer = QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._check_stale, Qt.DirectConnection)
+        self._timer.start(int(self.heartbeat_timeout * 1000))
+
+        self._flush_timer = QTimer()
+        self._flush_timer.timeout.connect(self._flush, Qt.DirectConnection)
+        self._flush_timer.start(50)
+
         self.monitor_node.start()
-        self.is_running = True
-
-        while self.is_running:
-            time.sleep(1)
-            current_time = time.time()
-            for node_id in self.known_nodes:
-                if node_id != 0:
-                    if node_id in self.monitor_node.last_heartbeat:
-                        if current_time - self.monitor_node.last_heartbeat[node_id] > 3:
-                            self.node_status_changed.emit(node_id, "Inactive")
-                            self.message_received.emit(f"Node {node_id} became inactive")
-                        elif self.monitor_node.nodes.get(node_id, {}).get("status") == "Inactive":
-                            self.node_status_changed.emit(node_id, "Active")
-                            self.message_received.emit(f"Node {node_id} became active")
+        if not self.isInterruptionRequested():
+            self.exec_()
+
+        # The timers belong to this thread, so tear them down here
+        self._timer.stop()
+        self._timer = None
+        self._flush_timer.stop()
+        self._flush_timer = None
+
+    def _on_heartbeat(self, from_node, data):
+        self._record_heartbeat(from_node)
+        self._announce_master(from_node)
+
+    def _on_election(self, from_node, data):
+        self.log_queue.put("Election process started")
+
+    def _on_new_master(self, from_node, data):
+        new_master = data['master_id']
+        self.log_queue.put(f"Node {new_master} became master")
+        self._announce_master(new_master)
+
+    def _record_heartbeat(self, node_id):
+        """Called from the monitor node's receive thread for each heartbeat"""
+        now = time.monotonic()
+        with self._lock:
+            version = self._version.get(node_id, 0) + 1
+            self._version[node_id] = version
+            # Pushed deadlines are always the latest, so the armed timer stays valid
+            heapq.heappush(self._deadlines, (now + self.heartbeat_timeout, node_id, version))
+            recovered = node_id in self._inactive
+            self._inactive.discard(node_id)
+            if recovered:
+                self._pending_status[node_id] = "Active"
+        if recovered:
+            self.log_queue.put(f"Node {node_id} became active")
+
+    def _announce_master(self, master_id):
+        # Every heartbeat names the same master; only signal actual changes
+        with self._lock:
+            if master_id == self._last_master:
+                return
+            self._last_master = master_id
+            self._pending_master = master_id
+
+    def _flush(self):
+        """Emit the signals buffered since the last tick"""
+        with self._lock:
+            new_nodes, self._new_nodes = self._new_nodes, set()
+            statuses, self._pending_status = self._pending_status, {}
+            master, self._pending_master = self._pending_master, None
+        for node_id in sorted(new_nodes):
+            self.node_added.emit(5000 + node_id, "NODE")
+        for node_id, status in statuses.items():
+            self.node_status_changed.emit(node_id, status)
+        if master is not None:
+            self.master_changed.emit(master)
+
+    def _check_stale(self):
+        now = time.monotonic()
+        expired = []
+        deadlines = self._deadlines
+        versions = self._version
+        inactive = self._inactive
+        with self._lock:
+            while deadlines and deadlines[0][0] <= now:
+                _, node_id, version = heapq.heappop(deadlines)
+                # Only stale if no newer heartbeat pushed a later deadline
+                if version == versions[node_id] and node_id not in inactive:
+                    inactive.add(node_id)
+                    expired.append(node_id)
+                    self._pending_status[node_id] = "Inactive"
+                    if node_id == self._last_master:
+                        # The GUI drops an inactive master's highlight, so
+                        # its next heartbeat must be announced again
+                        self._last_master = None
+            next_deadline = deadlines[0][0] if deadlines else now + self.heartbeat_timeout
+
+        for node_id in expired:
+            self.log_queue.put(f"Node {node_id} became inactive")
+        self._timer.start(max(0, int((next_deadline - now) * 1000)))
 
     def stop(self):
-        self.is_running = False
+        # Leave the thread's event loop and wait for run() to finish
+        self.requestInterruption()
+        self.quit()
+        self.wait()
         if self.monitor_node:
             self.monitor_node.stop()
 
@@ -250,6 +435,8 @@ class MonitorGUI(QMainWindow):
         self.log_text = QTextEdit()
         self.log_text.setReadOnly(True)
         self.log_text.setMinimumWidth(250)
+        # Let Qt drop the oldest lines so appends stay cheap on long runs
+        self.log_text.document().setMaximumBlockCount(1000)
         left_layout.addWidget(log_label)
         left_layout.addWidget(self.log_text)
 
@@ -259,13 +446,24 @@ class MonitorGUI(QMainWindow):
 
         # Start monitor thread
         self.monitor_thread = MonitorThread()
-        self.monitor_thread.message_received.connect(self.log_message)
         self.monitor_thread.node_status_changed.connect(self.network_viz.updateNodeStatus)
         self.monitor_thread.node_added.connect(self.network_viz.addNode)
         self.monitor_thread.master_changed.connect(self.network_viz.updateMasterStatus)
         self.monitor_thread.start()
 
-        
+        # Drain queued log lines with one append per tick
+        self._log_timer = QTimer(self)
+        self._log_timer.timeout.connect(self._drain_log)
+        self._log_timer.start(100)
+
+    def _drain_log(self):
+        log_queue = self.monitor_thread.log_queue
+        batch = []
+        while not log_queue.empty():
+            batch.append(log_queue.get_nowait())
+        if batch:
+            self.log_message("\n".join(batch))
+
     def log_message(self, message):
         self.log_text.append(message)
 
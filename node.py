@@ -1,8 +1,26 @@
 from node_base import Node, NodeType
+import logging
+import logging.handlers
+import queue
 import sys
 import time
 
+def setup_logging():
+    """Log through a queue so nodes never wait on console output"""
+    log_queue = queue.SimpleQueue()
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(message)s',
+                                           datefmt='%Y-%m-%d %H:%M:%S'))
+    listener = logging.handlers.QueueListener(log_queue, console)
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener.start()
+    return listener
+
 def main(ip_address):
+    listener = setup_logging()
+
     # Create node on a fixed port (e.g., 5000)
     node = Node(ip_address=ip_address, port=5000, node_type=NodeType.NODE)
     
@@ -19,7 +37,7 @@ def main(ip_address):
     
     node.start()
     
-    print(f"Node started on {ip_address} (ID: {int(ip_address.split('.')[-1])})")
+    print(f"Node started on {ip_address} (ID: {node.node_id})")
     
     try:
         while True:
@@ -27,6 +45,8 @@ def main(ip_address):
     except KeyboardInterrupt:
         node.stop()
         print(f"\nNode on {ip_address} stopped")
+    finally:
+        listener.stop()
 
 if __name__ == "__main__":
     if len(sys.argv) != 2:
@@ -1,179 +1,589 @@
+import heapq
+import itertools
+import logging
+import selectors
 import socket
+import struct
 import threading
 import time
-import json
 from enum import Enum
+import codec
+from udp_batch import RecvBatch, SendBatch
+
+logger = logging.getLogger(__name__)
+
+# Datagrams a node handles per reactor wakeup; anything left is picked up on
+# the next select() so one busy socket cannot starve the others
+_DRAIN_BUDGET = 10
+_MAX_DATAGRAM = 2048  # Mesh messages are a few dozen bytes
+
+HEARTBEAT_INTERVAL = 1.0  # seconds between master heartbeats
+HEARTBEAT_TIMEOUT = 3.0   # seconds of silence before the master is presumed dead
+MIN_HEARTBEATS = 3        # consecutive heartbeats needed to confirm a master
+ELECTION_TIMEOUT = 2.0    # seconds to wait for a higher node to answer
+ELECTION_DELAY = 0.5      # pause between answering an ELECTION and starting our own
+STARTUP_DELAY = 2.0       # pause after start() before the first election
+
+# Kernel socket buffer size; the default (~208 KiB) can overflow during
+# election bursts. Linux caps it at net.core.rmem_max/wmem_max.
+_SOCKET_BUFFER = 1 << 21
+
+class _Timer:
+    """Handle for a callback scheduled with _Reactor.call_later"""
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+class _Reactor:
+    """One selector loop per process that receives for every Node socket
+    and runs their timers"""
+
+    def __init__(self):
+        self._selector = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._timers = []  # heap of (deadline, seq, _Timer)
+        self._seq = itertools.count()
+        # Writing to _wake_w interrupts select() when an earlier timer is added
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+
+    def _ensure_thread(self):
+        # Called with _lock held
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def register(self, node, sock):
+        sock.setblocking(False)
+        with self._lock:
+            self._selector.register(sock, selectors.EVENT_READ, node)
+            self._ensure_thread()
+
+    def unregister(self, sock):
+        with self._lock:
+            try:
+                self._selector.unregister(sock)
+            except (KeyError, ValueError):
+                pass
+
+    def close(self, sock):
+        """Unregister and close sock on the reactor thread.
+
+        Closing from another thread could pull the fd out from under a
+        select() or recvmmsg() in progress, or let a new socket reuse it.
+        Blocks until the socket is closed.
+        """
+        if threading.current_thread() is self._thread:
+            self._close(sock)
+            return
+        closed = threading.Event()
+
+        def close():
+            self._close(sock)
+            closed.set()
+        self.call_later(0, close)
+        closed.wait()
+
+    def _close(self, sock):
+        self.unregister(sock)
+        sock.close()
+
+    def call_later(self, delay, callback):
+        """Run callback on the reactor thread after delay seconds"""
+        timer = _Timer(callback)
+        with self._lock:
+            heapq.heappush(self._timers, (time.monotonic() + delay, next(self._seq), timer))
+            earliest = self._timers[0][2] is timer
+            self._ensure_thread()
+        if earliest and threading.current_thread() is not self._thread:
+            try:
+                self._wake_w.send(b'\0')
+            except OSError:
+                pass  # Buffer full: a wakeup is already pending
+        return timer
+
+    def _run(self):
+        while True:
+            with self._lock:
+                timeout = max(0, self._timers[0][0] - time.monotonic()) if self._timers else None
+            for key, _ in self._selector.select(timeout):
+                if key.data is None:
+                    self._drain_wakeups()
+                    continue
+                try:
+                    key.data._handle_messages(key.fileobj)
+                except Exception:
+                    # A handler bug must not kill the loop every node shares
+                    logger.exception("Error handling message")
+            self._run_timers()
+
+    def _drain_wakeups(self):
+        try:
+            while self._wake_r.recv(64):
+                pass
+        except OSError:
+            pass
+
+    def _run_timers(self):
+        now = time.monotonic()
+        due = []
+        with self._lock:
+            while self._timers and self._timers[0][0] <= now:
+                due.append(heapq.heappop(self._timers)[2])
+        for timer in due:
+            if timer.cancelled:
+                continue
+            try:
+                timer.callback()
+            except Exception:
+                logger.exception("Error in timer callback")
 
 class NodeType(Enum):
     MONITOR = "MONITOR"
     NODE = "NODE"
 
 class Node:
-    def __init__(self, ip_address, port, node_type):
+    # Fixed attribute set: no per-instance __dict__, and faster attribute
+    # reads on the receive path
+    __slots__ = (
+        'ip_address', 'port', 'node_id', 'node_type', 'nodes',
+        '_node_ids', '_node_addrs', '_node_types', '_nid_to_idx',
+        'master_id', '_stopped', '_election_flag', 'last_heartbeat',
+        'socket', 'is_master', 'election_timeout', '_heartbeat_timer', '_next_heartbeat', '_monitor_timer',
+        'heartbeat_count', 'election_lock', '_send_batch', '_outbox', '_batching',
+        '_hb_packet', '_hb_packets', '_election_packets', '_has_higher_peer',
+        '_handlers', 'message_handler', '_recv_batch',
+        'multicast_group', '_mcast_socket', '_monitor_addrs',
+        'min_heartbeats', 'heartbeat_interval', 'heartbeat_timeout',
+    )
+    _reactor = _Reactor()  # Shared by every Node in the process
+
+    def __init__(self, ip_address, port, node_type, multicast_group=None, reuse_port=False):
         self.ip_address = ip_address
         self.port = port
-        self.node_id = int(ip_address.split('.')[-1])
+        self.node_id = socket.inet_aton(ip_address)[-1]  # Last octet
         self.node_type = node_type
         self.nodes = {}  # {node_id: (ip_address, port, node_type)}
+        # The same peers (minus ourselves) as parallel lists, so the send
+        # paths walk flat lists instead of unpacking dict items
+        self._node_ids = []
+        self._node_addrs = []  # (ip_address, port)
+        self._node_types = []
+        self._nid_to_idx = {}
         self.master_id = None
-        self.is_running = False
-        self.election_in_progress = False
+        # Set while the node is stopped
+        self._stopped = threading.Event()
+        self._stopped.set()
+        # Set while an election is running; read without a lock on the
+        # receive path, changed under election_lock where it is tested first
+        self._election_flag = threading.Event()
+        # {node_id: time.monotonic() of last heartbeat}; only touched on the
+        # reactor thread, so it needs no lock
         self.last_heartbeat = {}
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._set_priority()
+        self._set_reuse(self.socket, reuse_port)
+        self._set_buffers(self.socket)
         self.socket.bind((ip_address, self.port))
         self.is_master = False
         self.election_timeout = None
+        # Per-instance so a node can be tuned after construction
+        self.min_heartbeats = MIN_HEARTBEATS
+        self.heartbeat_interval = HEARTBEAT_INTERVAL
+        self.heartbeat_timeout = HEARTBEAT_TIMEOUT
+        # Periodic work runs as reactor timers rather than per-node threads
+        self._heartbeat_timer = None
+        self._next_heartbeat = 0.0  # Monotonic deadline of the next heartbeat
+        self._monitor_timer = None
         self.heartbeat_count = {}  # Track consecutive heartbeats
-        self.min_heartbeats = 3    # Number of consecutive heartbeats needed to confirm master
-        self.heartbeat_interval = 1.0  # seconds
-        self.heartbeat_timeout = 3.0   # seconds
         self.election_lock = threading.Lock()
+        self._send_batch = SendBatch()
+        # Unicast replies made while handling a receive batch are queued here
+        # and leave together in one sendmmsg() when the batch ends
+        self._outbox = []
+        self._batching = False
+        self._hb_packet = self._encode_message('HEARTBEAT')  # Identical on every tick
+        self._hb_packets = []  # (_hb_packet, addr) per peer, rebuilt in register_node
+        # Only higher nodes can answer an ELECTION (monitors just log it), so
+        # elections go to these peers alone; rebuilt in register_node
+        self._election_packets = []
+        self._has_higher_peer = False
+        # Message type -> handler(from_node, data), looked up once per message
+        self._handlers = {
+            'HEARTBEAT': self._on_heartbeat,
+            'ELECTION': self._on_election,
+            'ELECTION_RESPONSE': self._on_election_response,
+            'NEW_MASTER': self._on_new_master,
+        }
+        # Optional callable(message) that replaces the built-in dispatch,
+        # for monitors that need to see every message
+        self.message_handler = None
+        # Each reactor wakeup reads up to _DRAIN_BUDGET datagrams with one
+        # recvmmsg() into reusable buffers
+        self._recv_batch = RecvBatch(capacity=_DRAIN_BUDGET, bufsize=_MAX_DATAGRAM)
+        # Optional multicast group (e.g. '239.1.1.1') for broadcasts: one
+        # send reaches every member instead of one datagram per peer
+        self.multicast_group = multicast_group
+        self._mcast_socket = None
+        # Monitors do not join the group, so broadcasts reach them by
+        # unicast; rebuilt in register_node
+        self._monitor_addrs = []
+        if multicast_group:
+            self._join_multicast()
         
+    def _set_priority(self):
+        """Mark mesh traffic high priority so heartbeats survive congestion.
+
+        DSCP EF (46) only helps if the mesh routers/switches honor DSCP.
+        """
+        try:
+            self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_TOS, 0xB8)
+            if hasattr(socket, 'SO_PRIORITY'):  # Linux only
+                self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_PRIORITY, 6)
+        except OSError as e:
+            logger.warning("Could not set socket priority: %s", e)
+
+    def _set_reuse(self, sock, shared):
+        """Let other sockets bind the same address when shared is true.
+
+        Off for the unicast socket by default: node identity is the IP, so a
+        duplicate launch must fail to bind rather than split our traffic.
+        On Linux SO_REUSEADDR alone already permits duplicate UDP binds, so
+        both options follow shared. UDP has no TIME_WAIT, so a restarted
+        node can rebind at once without either.
+        """
+        if not shared:
+            return
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, 'SO_REUSEPORT'):  # Not available on Windows
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            except OSError as e:
+                logger.warning("Could not set SO_REUSEPORT: %s", e)
+
+    def _set_buffers(self, sock):
+        """Enlarge the kernel buffers so bursts are queued rather than dropped"""
+        for option in (socket.SO_RCVBUF, socket.SO_SNDBUF):
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, option, _SOCKET_BUFFER)
+            except OSError as e:
+                logger.warning("Could not set socket buffer size: %s", e)
+
+    def _join_multicast(self):
+        """Send broadcasts to the group from our interface and receive them on a second socket"""
+        iface = socket.inet_aton(self.ip_address)
+        self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, iface)
+        self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+        # The unicast socket is bound to our own address, which cannot
+        # receive group traffic, so group datagrams arrive on their own socket
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        # Every node on this host binds the group address
+        self._set_reuse(sock, True)
+        self._set_buffers(sock)
+        sock.bind((self.multicast_group, self.port))
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP,
+                        socket.inet_aton(self.multicast_group) + iface)
+        self._mcast_socket = sock
+
+    @property
+    def election_in_progress(self):
+        return self._election_flag.is_set()
+
+    @property
+    def is_running(self):
+        return not self._stopped.is_set()
+
     def start(self):
-        self.is_running = True
-        threading.Thread(target=self._handle_messages, daemon=True).start()
+        self._stopped.clear()
+        self._reactor.register(self, self.socket)
+        if self._mcast_socket:
+            self._reactor.register(self, self._mcast_socket)
         
         if self.node_type == NodeType.NODE:
-            threading.Thread(target=self._monitor_heartbeat, daemon=True).start()
-            time.sleep(2)  # Wait for network stabilization
-            self._start_election()
+            # Wait for network stabilization without blocking the caller; with
+            # no master known yet the watchdog's first check starts an election
+            self._monitor_timer = self._reactor.call_later(STARTUP_DELAY, self._monitor_heartbeat)
 
     def register_node(self, ip_address, port, node_type):
-        node_id = int(ip_address.split('.')[-1])
+        node_id = socket.inet_aton(ip_address)[-1]
         self.nodes[node_id] = (ip_address, port, node_type)
+        if node_id == self.node_id:
+            return
+        idx = self._nid_to_idx.get(node_id)
+        if idx is None:
+            self._nid_to_idx[node_id] = len(self._node_ids)
+            self._node_ids.append(node_id)
+            self._node_addrs.append((ip_address, port))
+            self._node_types.append(node_type)
+        else:
+            self._node_addrs[idx] = (ip_address, port)
+            self._node_types[idx] = node_type
+        self._hb_packets = [(self._hb_packet, addr) for addr in self._node_addrs]
+        election = self._encode_message('ELECTION')
+        self._election_packets = [
+            (election, addr)
+            for nid, addr, ntype in zip(self._node_ids, self._node_addrs, self._node_types)
+            if ntype != NodeType.NODE or nid > self.node_id
+        ]
+        self._monitor_addrs = [
+            addr for addr, ntype in zip(self._node_addrs, self._node_types)
+            if ntype != NodeType.NODE
+        ]
+        self._has_higher_peer = any(
+            nid > self.node_id and ntype == NodeType.NODE
+            for nid, ntype in zip(self._node_ids, self._node_types)
+        )
+
+    def _encode_message(self, message_type, data=None):
+        """Serialize a message once for however many peers it goes to"""
+        return codec.encode(message_type, self.node_id, data)
 
     def _send_message(self, to_node_id, message_type, data=None):
-        if to_node_id in self.nodes:
-            ip_address, port, _ = self.nodes[to_node_id]
-            message = {
-                'type': message_type,
-                'from': self.node_id,
-                'data': data or {}
-            }
-            try:
-                self.socket.sendto(json.dumps(message).encode(), (ip_address, port))
-            except Exception as e:
-                print(f"Error sending message to {to_node_id}: {e}")
+        idx = self._nid_to_idx.get(to_node_id)
+        if idx is not None:
+            self._outbox.append((self._encode_message(message_type, data), self._node_addrs[idx]))
+            if not self._batching:
+                self._flush()
+
+    def _flush(self):
+        """Send everything queued in the outbox"""
+        packets, self._outbox = self._outbox, []
+        try:
+            self._send_batch.send(self.socket, packets)
+        except Exception as e:
+            logger.error("Error sending queued messages: %s", e)
 
     def _broadcast_message(self, message_type, data=None):
-        for node_id in self.nodes:
-            if node_id != self.node_id:  # Don't send to self
-                self._send_message(node_id, message_type, data)
+        self._broadcast_payload(self._encode_message(message_type, data), message_type)
+
+    def _broadcast_payload(self, payload, message_type):
+        if self.multicast_group:
+            try:
+                self.socket.sendto(payload, (self.multicast_group, self.port))
+            except OSError as e:
+                logger.error("Error broadcasting %s: %s", message_type, e)
+            if self._monitor_addrs:
+                self._send_packets([(payload, addr) for addr in self._monitor_addrs], message_type)
+            return
+        self._send_packets([(payload, addr) for addr in self._node_addrs], message_type)
+
+    def _send_packets(self, packets, message_type):
+        try:
+            # One sendmmsg() syscall for the whole mesh where available
+            self._send_batch.send(self.socket, packets)
+        except Exception as e:
+            logger.error("Error broadcasting %s: %s", message_type, e)
+
+    def _handle_messages(self, sock):
+        """Called by the reactor when one of our sockets is readable"""
+        self._batching = True
+        try:
+            self._receive_batch(sock)
+        finally:
+            self._batching = False
+            if self._outbox:
+                self._flush()
 
-    def _handle_messages(self):
-        while self.is_running:
+    def _receive_batch(self, sock):
+        if not self.is_running:
+            return
+        try:
+            views = self._recv_batch.recv(sock)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            logger.error("Error handling message: %s", e)
+            return
+        process = self.message_handler or self._process_message
+        for i, view in enumerate(views):
+            if len(view) == codec.HEADER_SIZE and view[0] == codec.HEARTBEAT:
+                # Most traffic is heartbeats; skip the decode
+                message = codec.heartbeat(view[1])
+            else:
+                try:
+                    message = codec.decode(view)
+                except (ValueError, struct.error) as e:
+                    # Garbage is dropped quietly so a flood of it stays cheap
+                    logger.debug("Dropped datagram from %s: %s", self._recv_batch.address(i), e)
+                    continue
+            # Multicast loops our own broadcasts back to us
+            if message['from'] == self.node_id:
+                continue
             try:
-                data, addr = self.socket.recvfrom(1024)
-                message = json.loads(data.decode())
-                self._process_message(message)
-            except Exception as e:
-                print(f"Error handling message: {e}")
+                process(message)
+            except Exception:
+                # Log and move on so one bad message does not lose the
+                # rest of the batch already read from the kernel
+                logger.exception("Error processing %s from node %s",
+                                 message['type'], message['from'])
 
     def _process_message(self, message):
-        msg_type = message['type']
-        from_node = message['from']
-        data = message['data']
-
-        if msg_type == 'HEARTBEAT':
-            self._handle_heartbeat(from_node)
-
-        elif msg_type == 'ELECTION':
-            with self.election_lock:
-                if not self.election_in_progress:
-                    self.election_in_progress = True
-                    if self.node_id > from_node:
-                        self._send_message(from_node, 'ELECTION_RESPONSE')
-                        time.sleep(0.5)  # Small delay before starting new election
-                        self._start_election()
-
-        elif msg_type == 'ELECTION_RESPONSE':
-            self.election_in_progress = False
-            if self.election_timeout:
-                self.election_timeout.cancel()
-
-        elif msg_type == 'NEW_MASTER':
-            new_master_id = data['master_id']
-            self._handle_new_master(new_master_id)
+        handler = self._handlers.get(message['type'])
+        if handler:
+            handler(message['from'], message['data'])
+
+    def _on_heartbeat(self, from_node, data):
+        self._handle_heartbeat(from_node)
+
+    def _on_election(self, from_node, data):
+        if self.node_id > from_node:
+            # Always answer a lower node, even mid-election, so two nodes
+            # that time out together do not both declare themselves master
+            self._send_message(from_node, 'ELECTION_RESPONSE')
+            if not self._election_flag.is_set():
+                # Deferred so the reactor keeps receiving meanwhile
+                self._reactor.call_later(ELECTION_DELAY, self._start_election)
+
+    def _on_election_response(self, from_node, data):
+        # A pending timeout sees the cleared flag and does nothing
+        self._election_flag.clear()
+        election_timeout = self.election_timeout
+        if election_timeout:
+            election_timeout.cancel()
+
+    def _on_new_master(self, from_node, data):
+        self._handle_new_master(data['master_id'])
 
     def _handle_heartbeat(self, from_node):
         """Handle received heartbeat with stability checks"""
-        current_time = time.time()
-        self.last_heartbeat[from_node] = current_time
-        
-        if from_node not in self.heartbeat_count:
-            self.heartbeat_count[from_node] = 1
-        else:
-            self.heartbeat_count[from_node] += 1
+        self.last_heartbeat[from_node] = time.monotonic()
+        # The counter only matters until the sender is our confirmed master
+        if self.master_id == from_node:
+            return
 
+        count = self.heartbeat_count.get(from_node, 0) + 1
+        self.heartbeat_count[from_node] = count
         # Only update master if we've received enough consecutive heartbeats
-        if self.heartbeat_count[from_node] >= self.min_heartbeats:
-            if self.master_id != from_node:
-                print(f"Node {self.node_id}: Confirmed new master {from_node} after {self.min_heartbeats} heartbeats")
-                self.master_id = from_node
-                self.is_master = False
+        if count >= self.min_heartbeats:
+            logger.info("Node %s: Confirmed new master %s after %s heartbeats",
+                        self.node_id, from_node, self.min_heartbeats)
+            self.master_id = from_node
+            self.is_master = False
 
     def _handle_new_master(self, new_master_id):
         """Handle new master announcement with stability checks"""
-        self.master_id = new_master_id
-        self.is_master = (self.node_id == new_master_id)
-        self.election_in_progress = False
+        with self.election_lock:
+            self.master_id = new_master_id
+            self.is_master = (self.node_id == new_master_id)
+            self._election_flag.clear()
         self.heartbeat_count = {}  # Reset heartbeat counts
+        # The announcement counts as the master's first heartbeat, so the
+        # watchdog gives it a full heartbeat_timeout before the first one
+        self.last_heartbeat[new_master_id] = time.monotonic()
         
         if self.is_master:
-            print(f"Node {self.node_id} becoming new master")
-            threading.Thread(target=self._send_heartbeat, daemon=True).start()
+            logger.info("Node %s becoming new master", self.node_id)
+            self._start_heartbeat()
         else:
-            print(f"Node {self.node_id} acknowledging new master {new_master_id}")
+            logger.info("Node %s acknowledging new master %s", self.node_id, new_master_id)
+
+    def _start_heartbeat(self):
+        if self._heartbeat_timer:
+            self._heartbeat_timer.cancel()
+        self._next_heartbeat = time.monotonic()
+        self._heartbeat_timer = self._reactor.call_later(0, self._send_heartbeat)
 
     def _send_heartbeat(self):
-        while self.is_running and self.is_master:
-            try:
-                self._broadcast_message('HEARTBEAT')
-                time.sleep(self.heartbeat_interval)
-            except Exception as e:
-                print(f"Error sending heartbeat: {e}")
+        """Broadcast one heartbeat and reschedule while we are master"""
+        if not (self.is_running and self.is_master):
+            return
+        try:
+            if self.multicast_group:
+                self._broadcast_payload(self._hb_packet, 'HEARTBEAT')
+            else:
+                # The peer list only changes in register_node, so the
+                # packet vector is reused as-is
+                self._send_packets(self._hb_packets, 'HEARTBEAT')
+        except Exception as e:
+            logger.error("Error sending heartbeat: %s", e)
+        # Schedule against fixed deadlines so send cost and wakeup latency
+        # do not accumulate into drift; after a stall, resume from now
+        now = time.monotonic()
+        self._next_heartbeat = max(self._next_heartbeat + self.heartbeat_interval, now)
+        self._heartbeat_timer = self._reactor.call_later(self._next_heartbeat - now, self._send_heartbeat)
 
     def _monitor_heartbeat(self):
-        while self.is_running:
-            if not self.is_master and not self.election_in_progress:
-                current_time = time.time()
-                if (self.master_id is None or 
-                    self.master_id not in self.last_heartbeat or 
-                    current_time - self.last_heartbeat[self.master_id] > self.heartbeat_timeout):
-                    
-                    # Clear heartbeat counts when starting new election
-                    self.heartbeat_count = {}
-                    self._start_election()
-                    
-            time.sleep(1)
+        """Start an election once the master has been quiet for heartbeat_timeout.
+
+        While the master is healthy this only wakes at the current deadline,
+        i.e. once per heartbeat_timeout rather than every second.
+        """
+        if not self.is_running:
+            return
+        delay = self.heartbeat_interval  # Re-check soon while not following a master
+        if not self.is_master and not self._election_flag.is_set():
+            master_id = self.master_id
+            last_seen = self.last_heartbeat.get(master_id)
+            remaining = None
+            if master_id is not None and last_seen is not None:
+                remaining = last_seen + self.heartbeat_timeout - time.monotonic()
+            if remaining is None or remaining < 0:
+                # Clear heartbeat counts when starting new election
+                self.heartbeat_count = {}
+                self._start_election()
+            else:
+                delay = remaining
+        self._monitor_timer = self._reactor.call_later(delay, self._monitor_heartbeat)
+
+    def _master_alive(self):
+        """Return True if the known master was heard within heartbeat_timeout"""
+        master_id = self.master_id
+        if master_id is None:
+            return False
+        last_seen = self.last_heartbeat.get(master_id)
+        return last_seen is not None and time.monotonic() - last_seen < self.heartbeat_timeout
 
     def _start_election(self):
+        if not self.is_running:  # Deferred call that outlived stop()
+            return
+        # A deferred call can land after an election already settled; only
+        # a node without a live master has anything to elect
+        if self.is_master or self._master_alive():
+            return
+        # Test-and-set under the lock so only one caller runs the election
         with self.election_lock:
-            if not self.election_in_progress:
-                self.election_in_progress = True
-                print(f"Node {self.node_id} starting election")
-                self._broadcast_message('ELECTION')
-                
-                # Set timeout for election
-                if self.election_timeout:
-                    self.election_timeout.cancel()
-                self.election_timeout = threading.Timer(2.0, self._election_timeout_handler)
-                self.election_timeout.start()
+            if self._election_flag.is_set():
+                return
+            self._election_flag.set()
+            old_timeout = self.election_timeout
+            # With no higher node there is nobody to wait for
+            delay = ELECTION_TIMEOUT if self._has_higher_peer else 0
+            timeout = self._reactor.call_later(delay, self._election_timeout_handler)
+            self.election_timeout = timeout
+        if old_timeout:
+            old_timeout.cancel()
+
+        logger.info("Node %s starting election", self.node_id)
+        # Unicast even with multicast on: lower nodes must not see it
+        self._send_packets(self._election_packets, 'ELECTION')
 
     def _election_timeout_handler(self):
         """Handle election timeout - become master if no response received"""
-        if self.election_in_progress:
+        with self.election_lock:
+            if not self._election_flag.is_set():
+                return
+            self._election_flag.clear()
             self.is_master = True
             self.master_id = self.node_id
-            print(f"Node {self.node_id} becoming new master (election timeout)")
-            self._broadcast_message('NEW_MASTER', {'master_id': self.node_id})
-            threading.Thread(target=self._send_heartbeat, daemon=True).start()
-            self.election_in_progress = False
+        self.last_heartbeat[self.node_id] = time.monotonic()
+        logger.info("Node %s becoming new master (election timeout)", self.node_id)
+        self._broadcast_message('NEW_MASTER', {'master_id': self.node_id})
+        self._start_heartbeat()
 
     def stop(self):
         if self.node_type == NodeType.NODE:
             self._broadcast_message('NODE_SHUTDOWN')
-        self.is_running = False
-        if self.election_timeout:
-            self.election_timeout.cancel()
-        self.socket.close()
\ No newline at end of file
+        self._stopped.set()
+        for timer in (self.election_timeout, self._heartbeat_timer, self._monitor_timer):
+            if timer:
+                timer.cancel()
+        self._reactor.close(self.socket)
+        if self._mcast_socket:
+            self._reactor.close(self._mcast_socket)
\ No newline at end of file
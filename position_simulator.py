@@ -1,68 +1,108 @@
+import logging
 import socket
 import time
 import math
-import random
 import sys
 import struct
+import numpy as np
+from udp_batch import SendBatch
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+logger = logging.getLogger(__name__)
+
+# Position datagram: node_id, x, y, z as native floats
+_POSITION = struct.Struct("ffff")
+
+# The GUI's position receiver, as a literal address so no name lookup is needed
+_DEST = ('127.0.0.1', 17500)
+
+def _update_arrays(angles, speeds, xs, ys, zs, center_x, center_y, radius, dz):
+    """Advance every node one tick with whole-array numpy operations"""
+    angles += speeds
+    np.mod(angles, 2 * math.pi, out=angles)
+    # Keep away from borders
+    np.clip(center_x + radius * np.cos(angles), 0.5, 4.5, out=xs)
+    np.clip(center_y + radius * np.sin(angles), 0.5, 4.5, out=ys)
+    zs += dz
+    np.clip(zs, 0.0, 1.5, out=zs)
+
+def _update_loop(angles, speeds, xs, ys, zs, center_x, center_y, radius, dz):
+    """Same update as _update_arrays, one node at a time, for numba to compile"""
+    two_pi = 2 * math.pi
+    for i in range(angles.shape[0]):
+        angle = (angles[i] + speeds[i]) % two_pi
+        angles[i] = angle
+        xs[i] = min(4.5, max(0.5, center_x + radius * math.cos(angle)))
+        ys[i] = min(4.5, max(0.5, center_y + radius * math.sin(angle)))
+        zs[i] = min(1.5, max(0.0, zs[i] + dz[i]))
+
+# A compiled loop beats the numpy temporaries once fleets get large
+_update = njit(cache=True)(_update_loop) if njit else _update_arrays
 
 class PositionSimulator:
     def __init__(self, node_ids=[1, 2, 3]):
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1 << 20)
+        # The destination never changes, so connect once and let the kernel
+        # keep the route instead of passing an address with every datagram
+        self.socket.connect(_DEST)
+        self._send_batch = SendBatch(capacity=max(len(node_ids), 1))
         self.node_ids = node_ids
-        self.node_positions = {}
+        self._rng = np.random.default_rng()
+        n = len(node_ids)
+        
+        # Per-node state as parallel arrays (index i is node_ids[i]) so each
+        # tick updates every node in one _update call
+        self.xs = self._rng.uniform(1.0, 4.0, n)  # Keep away from borders
+        self.ys = self._rng.uniform(1.0, 4.0, n)
+        self.zs = self._rng.uniform(0.0, 1.0, n)  # Z height
+        self.angles = self._rng.uniform(0, 2 * math.pi, n)
+        self.speeds = self._rng.uniform(0.02, 0.05, n)
         
-        # Initialize positions for each node with random positions in 0-5 range
-        for node_id in node_ids:
-            self.node_positions[node_id] = {
-                'x': random.uniform(1.0, 4.0),  # Keep away from borders
-                'y': random.uniform(1.0, 4.0),
-                'z': random.uniform(0.0, 1.0),  # Z height
-                'angle': random.uniform(0, 2 * math.pi),
-                'speed': random.uniform(0.02, 0.05)
-            }
+        # Every tick packs into one reused buffer; the batch of packets
+        # (slices into it, sent on the connected socket) is built once
+        size = _POSITION.size
+        self._tx_buf = bytearray(size * n)
+        view = memoryview(self._tx_buf)
+        self._packets = [(view[i * size:(i + 1) * size], None) for i in range(n)]
 
     def update_positions(self):
         """Update positions using circular motion with random variations"""
-        for node_id in self.node_ids:
-            pos = self.node_positions[node_id]
-            
-            # Update angle and add some random movement
-            pos['angle'] += pos['speed']
-            if pos['angle'] > 2 * math.pi:
-                pos['angle'] -= 2 * math.pi
-                
-            # Calculate new position with some random variation
-            center_x = 2.5 + random.uniform(-0.05, 0.05)  # Center of the area
-            center_y = 2.5 + random.uniform(-0.05, 0.05)
-            radius = 1.5 + random.uniform(-0.25, 0.25)    # Orbit radius
-            
-            # Update x and y positions
-            pos['x'] = center_x + radius * math.cos(pos['angle'])
-            pos['y'] = center_y + radius * math.sin(pos['angle'])
-            
-            # Add small random movement to z
-            pos['z'] += random.uniform(-0.05, 0.05)
-            
-            # Ensure positions stay within bounds
-            pos['x'] = max(0.5, min(4.5, pos['x']))  # Keep away from borders
-            pos['y'] = max(0.5, min(4.5, pos['y']))
-            pos['z'] = max(0.0, min(1.5, pos['z']))
+        rng = self._rng
+        # The center and radius jitter move the whole formation, so they are
+        # drawn once per tick; only the z drift is per node. Randomness is
+        # drawn here (numba's RNG is not shared with numpy's)
+        center_x = 2.5 + rng.uniform(-0.05, 0.05)  # Center of the area
+        center_y = 2.5 + rng.uniform(-0.05, 0.05)
+        radius = 1.5 + rng.uniform(-0.25, 0.25)    # Orbit radius
+        dz = rng.uniform(-0.05, 0.05, len(self.node_ids))
+        _update(self.angles, self.speeds, self.xs, self.ys, self.zs,
+                center_x, center_y, radius, dz)
 
     def send_positions(self):
         """Send current positions via UDP using struct packing"""
-        for node_id in self.node_ids:
-            pos = self.node_positions[node_id]
-            
+        pack_into = _POSITION.pack_into
+        buf = self._tx_buf
+        size = _POSITION.size
+        # Per-node lines are debug output; check the level once per tick
+        verbose = logger.isEnabledFor(logging.DEBUG)
+        for i, (node_id, x, y, z) in enumerate(zip(self.node_ids, self.xs.tolist(),
+                                                   self.ys.tolist(), self.zs.tolist())):
             # Pack data as: node_id (float), x (float), y (float), z (float)
-            packed_data = struct.pack("ffff", 
-                float(node_id),
-                pos['x'],
-                pos['y'],
-                pos['z']
-            )
-            
-            self.socket.sendto(packed_data, ('localhost', 17500))
-            print(f"Sent position update for Node {node_id}: x={pos['x']:.3f}, y={pos['y']:.3f}, z={pos['z']:.3f}")
+            pack_into(buf, i * size, float(node_id), x, y, z)
+            if verbose:
+                logger.debug("Sent position update for Node %s: x=%.3f, y=%.3f, z=%.3f",
+                             node_id, x, y, z)
+
+        # Every node's update goes out in one sendmmsg() call where available
+        try:
+            self._send_batch.send(self.socket, self._packets)
+        except ConnectionRefusedError:
+            pass  # Connected UDP reports a receiver that is not up yet; keep going
 
     def run(self, update_interval=0.5):
         """Run the simulation with specified update interval"""
@@ -70,20 +110,38 @@ class PositionSimulator:
         print("Press Ctrl+C to stop")
         
         try:
+            # Sleep to fixed monotonic deadlines so the update and send time
+            # does not stretch the interval
+            next_tick = time.monotonic()
             while True:
                 self.update_positions()
                 self.send_positions()
-                time.sleep(update_interval)
+                next_tick += update_interval
+                delay = next_tick - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_tick = time.monotonic()  # Fell behind; don't burst to catch up
         except KeyboardInterrupt:
             print("\nStopping simulation...")
         finally:
             self.socket.close()
 
 def main():
+    # -v/--verbose logs every position update
+    args = sys.argv[1:]
+    verbose = any(arg in ('-v', '--verbose') for arg in args)
+    args = [arg for arg in args if arg not in ('-v', '--verbose')]
+    logging.basicConfig(
+        level=logging.DEBUG if verbose else logging.INFO,
+        format='%(asctime)s [%(levelname)s] %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+
     # Parse command line arguments for node IDs
-    if len(sys.argv) > 1:
+    if args:
         try:
-            node_ids = [int(arg) for arg in sys.argv[1:]]
+            node_ids = [int(arg) for arg in args]
         except ValueError:
             print("Error: Node IDs must be integers")
             sys.exit(1)
@@ -0,0 +1,65 @@
+import struct
+
+import pytest
+
+import codec
+
+
+@pytest.mark.parametrize('message_type', [
+    'ELECTION', 'ELECTION_RESPONSE', 'NODE_SHUTDOWN', 'HEARTBEAT',
+])
+def test_bare_message_round_trip(message_type):
+    frame = codec.encode(message_type, 7)
+    assert len(frame) == codec.HEADER_SIZE
+    assert codec.decode(frame) == {'type': message_type, 'from': 7, 'data': {}}
+
+
+def test_message_with_data_round_trip():
+    frame = codec.encode('NEW_MASTER', 3, {'master_id': 3})
+    assert frame[0] == codec.NEW_MASTER
+    assert codec.decode(frame) == {'type': 'NEW_MASTER', 'from': 3, 'data': {'master_id': 3}}
+
+
+def test_unknown_type_round_trips_as_json():
+    frame = codec.encode('STATUS', 255, {'load': 0.5, 'name': 'né'})
+    assert frame[:1] == b'{'
+    assert codec.decode(frame) == {'type': 'STATUS', 'from': 255, 'data': {'load': 0.5, 'name': 'né'}}
+
+
+def test_decode_reads_memoryview_slice():
+    buf = bytearray(64)
+    frame = codec.encode('NEW_MASTER', 9, {'master_id': 9})
+    buf[:len(frame)] = frame
+    message = codec.decode(memoryview(buf)[:len(frame)])
+    assert message == {'type': 'NEW_MASTER', 'from': 9, 'data': {'master_id': 9}}
+
+
+def test_decode_ignores_trailing_bytes_after_frame():
+    frame = codec.encode('NEW_MASTER', 3, {'master_id': 3})
+    assert codec.decode(frame + b'junk')['data'] == {'master_id': 3}
+
+
+@pytest.mark.parametrize('datagram', [
+    b'',
+    b'hello',                                          # Not JSON, not a frame
+    b'{not json',
+    b'{"type": "X", "from": 1}',                       # Missing data
+    b'{"type": 1, "from": 1, "data": {}}',
+    b'{"type": "X", "from": -1, "data": {}}',
+    b'{"type": "X", "from": 256, "data": {}}',
+    b'{"type": "X", "from": true, "data": {}}',
+    b'{"type": "X", "from": "1", "data": {}}',
+    b'{"type": "X", "from": 1, "data": []}',
+    struct.pack('!BBH', 15, 1, 0),                     # Unknown opcode
+    struct.pack('!BBH', codec.NEW_MASTER, 1, 10) + b'{}',  # Truncated
+    struct.pack('!BBH', codec.NEW_MASTER, 1, 2) + b'[]',   # Data not an object
+    struct.pack('!BBH', codec.NEW_MASTER, 1, 2) + b'{x',
+])
+def test_decode_rejects_malformed(datagram):
+    with pytest.raises(ValueError):
+        codec.decode(datagram)
+
+
+def test_decode_rejects_short_header():
+    with pytest.raises(struct.error):
+        codec.decode(bytes([codec.ELECTION, 1]))
@@ -0,0 +1,101 @@
+import select
+import socket
+
+import pytest
+
+import udp_batch
+from udp_batch import RecvBatch, SendBatch
+
+
+@pytest.fixture(params=['mmsg', 'fallback'])
+def path(request, monkeypatch):
+    if request.param == 'mmsg':
+        if udp_batch._sendmmsg is None or udp_batch._recvmmsg is None:
+            pytest.skip("sendmmsg/recvmmsg not available")
+    else:
+        monkeypatch.setattr(udp_batch, '_sendmmsg', None)
+        monkeypatch.setattr(udp_batch, '_recvmmsg', None)
+    return request.param
+
+
+@pytest.fixture
+def pair():
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(('127.0.0.1', 0))
+    receiver.setblocking(False)
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sender.bind(('127.0.0.1', 0))
+    yield sender, receiver
+    sender.close()
+    receiver.close()
+
+
+def receive(batch, sock, count):
+    """Return [(bytes, addr), ...] for count datagrams read through batch"""
+    received = []
+    while len(received) < count:
+        assert select.select([sock], [], [], 2.0)[0], "timed out waiting for datagrams"
+        views = batch.recv(sock)
+        received.extend((bytes(view), batch.address(i)) for i, view in enumerate(views))
+    return received
+
+
+def test_send_and_receive_batch(path, pair):
+    sender, receiver = pair
+    dest = receiver.getsockname()
+    payloads = [b'one', bytearray(b'two'), memoryview(b'three'), b'']
+    SendBatch().send(sender, [(data, dest) for data in payloads])
+
+    received = receive(RecvBatch(), receiver, len(payloads))
+    assert [data for data, _ in received] == [bytes(p) for p in payloads]
+    assert all(addr == sender.getsockname() for _, addr in received)
+
+
+def test_batches_larger_than_capacity(path, pair):
+    sender, receiver = pair
+    dest = receiver.getsockname()
+    payloads = [bytes([i]) * (i + 1) for i in range(10)]
+    SendBatch(capacity=4).send(sender, [(data, dest) for data in payloads])
+
+    # Loopback queues every datagram before send() returns
+    batch = RecvBatch(capacity=4)
+    first = [bytes(view) for view in batch.recv(receiver)]
+    assert first == payloads[:4]
+    received = [data for data, _ in receive(batch, receiver, 6)]
+    assert received == payloads[4:]
+
+
+def test_send_on_connected_socket(path, pair):
+    sender, receiver = pair
+    sender.connect(receiver.getsockname())
+    SendBatch().send(sender, [(b'a', None), (b'b', None)])
+
+    received = receive(RecvBatch(), receiver, 2)
+    assert [data for data, _ in received] == [b'a', b'b']
+
+
+def test_recv_with_nothing_waiting(path, pair):
+    _, receiver = pair
+    with pytest.raises(BlockingIOError):
+        RecvBatch().recv(receiver)
+
+
+def test_long_datagram_is_truncated_to_bufsize(path, pair):
+    sender, receiver = pair
+    sender.sendto(b'x' * 100, receiver.getsockname())
+
+    received = receive(RecvBatch(capacity=2, bufsize=16), receiver, 1)
+    assert received[0][0] == b'x' * 16
+
+
+def test_repeated_packets_across_cache_eviction(path, pair, monkeypatch):
+    sender, receiver = pair
+    monkeypatch.setattr(udp_batch, '_MAX_CACHED_BUFFERS', 2)
+    dest = receiver.getsockname()
+    packets = [(bytes([i]) * 4, dest) for i in range(5)]
+    batch = SendBatch()
+    batch.send(sender, packets)
+    batch.send(sender, packets)
+
+    received = [data for data, _ in receive(RecvBatch(), receiver, 10)]
+    assert received == [data for data, _ in packets] * 2
@@ -0,0 +1,267 @@
+"""Batched UDP sends and receives through Linux sendmmsg(2)/recvmmsg(2).
+
+Python's socket module has neither, so they are called through ctypes.
+On other platforms, or if the kernel/libc lacks them, every datagram falls
+back to a plain sock.sendto() / sock.recvfrom_into().
+"""
+import ctypes
+import ctypes.util
+import errno
+import socket
+import sys
+import threading
+
+
+class _IOVec(ctypes.Structure):
+    _fields_ = [
+        ('iov_base', ctypes.c_void_p),
+        ('iov_len', ctypes.c_size_t),
+    ]
+
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [
+        ('msg_name', ctypes.c_void_p),
+        ('msg_namelen', ctypes.c_uint32),
+        ('msg_iov', ctypes.POINTER(_IOVec)),
+        ('msg_iovlen', ctypes.c_size_t),
+        ('msg_control', ctypes.c_void_p),
+        ('msg_controllen', ctypes.c_size_t),
+        ('msg_flags', ctypes.c_int),
+    ]
+
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [
+        ('msg_hdr', _MsgHdr),
+        ('msg_len', ctypes.c_uint),
+    ]
+
+
+class _SockAddrIn(ctypes.Structure):
+    _fields_ = [
+        ('sin_family', ctypes.c_ushort),
+        ('sin_port', ctypes.c_uint8 * 2),   # network byte order
+        ('sin_addr', ctypes.c_uint8 * 4),
+        ('sin_zero', ctypes.c_uint8 * 8),
+    ]
+
+
+def _load_libc_function(name, argtypes):
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fn = getattr(libc, name)
+    except (OSError, AttributeError):
+        return None
+    fn.argtypes = argtypes
+    fn.restype = ctypes.c_int
+    return fn
+
+
+def _load_sendmmsg():
+    return _load_libc_function(
+        'sendmmsg', [ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint, ctypes.c_int])
+
+
+def _load_recvmmsg():
+    return _load_libc_function(
+        'recvmmsg', [ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint, ctypes.c_int, ctypes.c_void_p])
+
+
+_sendmmsg = _load_sendmmsg()
+_recvmmsg = _load_recvmmsg()
+
+# Most sends repeat the same few bytes objects (heartbeats, elections), so
+# SendBatch remembers their buffer addresses; bounded for one-off packets
+_MAX_CACHED_BUFFERS = 256
+
+
+def _buffer_address(data):
+    """Return (address, keepalive) for the bytes-like object data, without copying"""
+    if isinstance(data, bytes):
+        ptr = ctypes.c_char_p(data)
+        return ctypes.cast(ptr, ctypes.c_void_p).value, ptr
+    view = memoryview(data)
+    if view.readonly:
+        # Read-only non-bytes buffer: fall back to a copy
+        buf = ctypes.create_string_buffer(view.tobytes(), view.nbytes)
+    else:
+        buf = (ctypes.c_char * view.nbytes).from_buffer(view)
+    return ctypes.addressof(buf), buf
+
+
+class SendBatch:
+    """Reusable sendmmsg() message vector, shared safely between threads"""
+
+    def __init__(self, capacity=64):
+        self.capacity = capacity
+        self._msgs = (_MMsgHdr * capacity)()
+        self._iovs = (_IOVec * capacity)()
+        self._addrs = {}  # {(host, port): _SockAddrIn}
+        # {id(data): (data, address)} for bytes packets; holding data keeps
+        # the object (and so its id and buffer) alive while it is cached
+        self._buffers = {}
+        self._lock = threading.Lock()
+        for i in range(capacity):
+            hdr = self._msgs[i].msg_hdr
+            hdr.msg_iov = ctypes.pointer(self._iovs[i])
+            hdr.msg_iovlen = 1
+
+    def _sockaddr(self, addr):
+        sa = self._addrs.get(addr)
+        if sa is None:
+            host, port = addr
+            sa = _SockAddrIn()
+            sa.sin_family = socket.AF_INET
+            sa.sin_port[:] = port.to_bytes(2, 'big')
+            sa.sin_addr[:] = socket.inet_aton(socket.gethostbyname(host))
+            self._addrs[addr] = sa
+        return sa
+
+    def send(self, sock, packets):
+        """Send [(data, addr), ...] on sock, one syscall per batch of up to capacity.
+
+        addr may be None for a connected socket. A datagram that fails is
+        skipped so the rest still go out; the first error is raised at the end.
+        """
+        with self._lock:
+            self._send(sock, packets)
+
+    def _send(self, sock, packets):
+        global _sendmmsg
+        first_error = None
+        start = 0
+        while start < len(packets):
+            if _sendmmsg is None:
+                for data, addr in packets[start:]:
+                    try:
+                        if addr is None:
+                            sock.send(data)
+                        else:
+                            sock.sendto(data, addr)
+                    except OSError as e:
+                        first_error = first_error or e
+                break
+
+            chunk = packets[start:start + self.capacity]
+            keepalive = []
+            buffers = self._buffers
+            for i, (data, addr) in enumerate(chunk):
+                if type(data) is bytes:
+                    # Immutable, so the address is fixed for the object's life
+                    entry = buffers.get(id(data))
+                    if entry is None:
+                        if len(buffers) >= _MAX_CACHED_BUFFERS:
+                            buffers.clear()
+                        entry = buffers[id(data)] = (data, _buffer_address(data)[0])
+                    base = entry[1]
+                else:
+                    base, ref = _buffer_address(data)
+                    keepalive.append(ref)
+                self._iovs[i].iov_base = base
+                self._iovs[i].iov_len = len(data)
+                hdr = self._msgs[i].msg_hdr
+                if addr is None:
+                    hdr.msg_name = None
+                    hdr.msg_namelen = 0
+                else:
+                    sa = self._sockaddr(addr)
+                    hdr.msg_name = ctypes.addressof(sa)
+                    hdr.msg_namelen = ctypes.sizeof(sa)
+
+            sent = _sendmmsg(sock.fileno(), self._msgs, len(chunk), 0)
+            if sent < 0:
+                err = ctypes.get_errno()
+                if err == errno.ENOSYS:
+                    _sendmmsg = None
+                    continue
+                if err == errno.EINTR:
+                    continue
+                if err in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    raise BlockingIOError(err, 'sendmmsg would block')
+                first_error = first_error or OSError(err, f"sendmmsg: {errno.errorcode.get(err, err)}")
+                sent = 1  # skip the datagram that failed
+            start += sent
+
+        if first_error is not None:
+            raise first_error
+
+
+class RecvBatch:
+    """Reusable recvmmsg() receive vector with preallocated datagram buffers.
+
+    Not thread-safe: use one per receiving thread.
+    """
+
+    def __init__(self, capacity=32, bufsize=2048):
+        self.capacity = capacity
+        self.bufsize = bufsize
+        self._buf = bytearray(capacity * bufsize)
+        self._view = memoryview(self._buf)
+        self._slots = [self._view[i * bufsize:(i + 1) * bufsize] for i in range(capacity)]
+        self._addrs = []  # Fallback path: source address per datagram
+        self._msgs = (_MMsgHdr * capacity)()
+        self._iovs = (_IOVec * capacity)()
+        self._names = (_SockAddrIn * capacity)()
+        self._cbuf = (ctypes.c_char * len(self._buf)).from_buffer(self._buf)
+        base = ctypes.addressof(self._cbuf)
+        for i in range(capacity):
+            self._iovs[i].iov_base = base + i * bufsize
+            self._iovs[i].iov_len = bufsize
+            hdr = self._msgs[i].msg_hdr
+            hdr.msg_iov = ctypes.pointer(self._iovs[i])
+            hdr.msg_iovlen = 1
+            hdr.msg_name = ctypes.addressof(self._names[i])
+
+    def recv(self, sock):
+        """Receive up to capacity waiting datagrams from the non-blocking sock.
+
+        Returns a list of memoryviews that stay valid until the next call.
+        Raises BlockingIOError if nothing is waiting.
+        """
+        global _recvmmsg
+        if _recvmmsg is None:
+            return self._recv_fallback(sock)
+        namelen = ctypes.sizeof(_SockAddrIn)
+        for i in range(self.capacity):
+            self._msgs[i].msg_hdr.msg_namelen = namelen
+        while True:
+            count = _recvmmsg(sock.fileno(), self._msgs, self.capacity, 0, None)
+            if count >= 0:
+                break
+            err = ctypes.get_errno()
+            if err == errno.ENOSYS:
+                _recvmmsg = None
+                return self._recv_fallback(sock)
+            if err == errno.EINTR:
+                continue
+            if err in (errno.EAGAIN, errno.EWOULDBLOCK):
+                raise BlockingIOError(err, 'recvmmsg would block')
+            raise OSError(err, f"recvmmsg: {errno.errorcode.get(err, err)}")
+        self._addrs = []
+        slots = self._slots
+        msgs = self._msgs
+        return [slots[i][:msgs[i].msg_len] for i in range(count)]
+
+    def _recv_fallback(self, sock):
+        views = []
+        self._addrs = []
+        for slot in self._slots:
+            try:
+                nbytes, addr = sock.recvfrom_into(slot)
+            except (BlockingIOError, InterruptedError):
+                if views:
+                    break
+                raise BlockingIOError(errno.EAGAIN, 'recv would block')
+            views.append(slot[:nbytes])
+            self._addrs.append(addr)
+        return views
+
+    def address(self, index):
+        """Return the (host, port) that sent datagram index of the last recv()"""
+        if self._addrs:
+            return self._addrs[index]
+        name = self._names[index]
+        return socket.inet_ntoa(bytes(name.sin_addr)), int.from_bytes(bytes(name.sin_port), 'big')